@@ -1,13 +1,18 @@
 import sys
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
+from pathlib import Path
 
 from photon import PHOTON_LOGGER
-from photon.lib.notify import notify
+from photon.lib.batch import BATCH_JOBS, PackageBatch, readPackageList
 from photon.lib.package import Package, PhotonPackage
 
 
+# < notify and networking are imported by the modes that need them > #
+# < so that run, help and version start as fast as possible > #
+
+
 # < ----------------------------------------------------------------------- > #
 
 
@@ -19,6 +24,10 @@ class Mode(Enum):
     UPDATE    = 3
     INSTALL   = 4
     UNINSTALL = 5
+    ROLLBACK  = 6
+    DAEMON    = 7
+    LIST      = 8
+    OUTDATED  = 9
     # fmt:on
 
 
@@ -28,8 +37,9 @@ class Mode(Enum):
 @dataclass
 class Settings:
     MODE: Mode
-    PACKAGE: Package
+    PACKAGES: list[Package] = field(default_factory=list)
     LOG_LEVEL: int = 20
+    JOBS: int = BATCH_JOBS
 
 
 # < ----------------------------------------------------------------------- > #
@@ -80,6 +90,18 @@ def strToMode(mode: str) -> Mode:
         case "uninstall":
             return Mode.UNINSTALL
 
+        case "rollback":
+            return Mode.ROLLBACK
+
+        case "daemon":
+            return Mode.DAEMON
+
+        case "list" | "status":
+            return Mode.LIST
+
+        case "outdated":
+            return Mode.OUTDATED
+
         case _:
             PHOTON_LOGGER.debug("unknown run mode, fallback to help")
             return Mode.HELP
@@ -96,17 +118,51 @@ def main() -> int:
         "update",
         "install",
         "uninstall",
+        "rollback",
+        "daemon",
+        "list",
+        "status",
+        "outdated",
     ]
 
     supported_options: list[str] = [
         "--log-level",
+        "--log-format",
+        "--jobs",
+        "--package-list",
+        "--preload",
+        "--notify-delay",
+    ]
+
+    # < options that take no value > #
+    supported_flags: list[str] = [
+        "--log-queue",
+        "--in-process",
+        "--subprocess",
+        "--no-daemon",
+        "--no-notify",
+    ]
+
+    # < modes that accept more than one package > #
+    batch_modes: list[Mode] = [
+        Mode.UPDATE,
+        Mode.INSTALL,
+        Mode.UNINSTALL,
+    ]
+
+    # < modes that do not take a package > #
+    packageless_modes: list[str] = [
+        "daemon",
+        "list",
+        "status",
+        "outdated",
     ]
 
     # < [0] / 1: path to __main__.py file > #
     # < [1] / 2: mode > #
-    # < [2] / 3: package > #
+    # < [2] / 3: package(s) > #
     # < less than three means mode or package are missing > #
-    if sys.argv.__len__() < 3:
+    if sys.argv.__len__() < 2 or (sys.argv.__len__() < 3 and sys.argv[1] not in packageless_modes):
         PHOTON_LOGGER.warning("too few arguments")
         return 1
 
@@ -117,28 +173,32 @@ def main() -> int:
     else:
         mode: Mode = strToMode(sys.argv[1])
 
-    # < package to run > #
-    package: Package | PhotonPackage
-    if sys.argv[2].endswith(".photon"):
-        PHOTON_LOGGER.info("using alternative package class")
-        package = PhotonPackage(sys.argv[2])
-    else:
-        package = Package(sys.argv[2])
-
     # < settings for photon > #
-    settings = Settings(mode, package)
+    settings = Settings(mode)
+
+    # < packages are everything before the first option > #
+    package_names: list[str] = []
+
+    index = 1
+
+    for arg in sys.argv[2:]:
+        if arg.startswith("--"):
+            break
+
+        index = index + 1
+        package_names.append(arg)
 
     # < split args between photon and the package > #
     # < -- is used to split > #
     photon_args: dict[str, str] = {}
+    photon_flags: list[str] = []
     package_args: list[str] = []
 
-    index = 2
     skip_next = False
     stop = False
     for_photon = True
 
-    for arg in sys.argv[3:]:
+    for arg in sys.argv[index + 1 :]:
         index = index + 1
 
         if skip_next:
@@ -150,8 +210,15 @@ def main() -> int:
             continue
 
         if for_photon and arg in supported_options:
+            if index + 1 >= sys.argv.__len__():
+                PHOTON_LOGGER.warning(f"missing value for option: {arg}")
+                stop = True
+                break
+
             photon_args[arg] = sys.argv[index + 1]
             skip_next = True
+        elif for_photon and arg in supported_flags:
+            photon_flags.append(arg)
         elif for_photon:
             PHOTON_LOGGER.warning(f"unsupported option: {arg}")
             stop = True
@@ -170,15 +237,157 @@ def main() -> int:
 
     PHOTON_LOGGER.setLevel(settings.LOG_LEVEL)
 
+    # < text or json lines > #
+    if "--log-format" in photon_args and not PHOTON_LOGGER.setFormat(photon_args["--log-format"]):
+        PHOTON_LOGGER.warning("unsupported log format")
+        return 1
+
+    # < write logs from a background thread > #
+    if "--log-queue" in photon_flags:
+        PHOTON_LOGGER.startQueue()
+
+    # < notifications are only configured when asked, the module stays unimported otherwise > #
+    if "--no-notify" in photon_flags or "--notify-delay" in photon_args:
+        from photon.lib.notify import configure
+
+        try:
+            delay = float(photon_args.get("--notify-delay", 0))
+        except ValueError:
+            PHOTON_LOGGER.warning("invalid notify delay")
+            return 1
+
+        configure("--no-notify" not in photon_flags, delay)
+
+    # < number of concurrent downloads > #
+    if "--jobs" in photon_args:
+        try:
+            settings.JOBS = int(photon_args["--jobs"])
+        except ValueError:
+            PHOTON_LOGGER.warning("invalid number of jobs")
+            return 1
+
+    # < extra packages from a file > #
+    if "--package-list" in photon_args:
+        package_list = Path(photon_args["--package-list"])
+
+        if not package_list.exists():
+            PHOTON_LOGGER.warning(f"package list not found: {package_list}")
+            return 1
+
+        package_names.extend(readPackageList(package_list))
+
+    # < keep a warm interpreter for run > #
+    if settings.MODE == Mode.DAEMON:
+        from photon.lib.daemon import serve
+
+        preload: list[str] = []
+
+        if "--preload" in photon_args:
+            preload = [module for module in photon_args["--preload"].split(",") if module]
+
+        return serve(preload)
+
+    # < everything in the package index > #
+    if settings.MODE == Mode.LIST:
+        from photon.lib.index import listPackages
+
+        return listPackages(settings.JOBS)
+
+    # < every indexed package unless told which > #
+    if settings.MODE == Mode.OUTDATED:
+        from photon.lib.index import PackageIndex
+
+        if package_names.__len__() < 1:
+            for name, entry in sorted(PackageIndex().entries().items()):
+                if entry.RAW_NAME is None:
+                    PHOTON_LOGGER.debug(f"{name} was installed without a source, skipping")
+                    continue
+
+                package_names.append(entry.RAW_NAME)
+
+        if package_names.__len__() < 1:
+            PHOTON_LOGGER.info("no packages to check")
+            return 0
+
+        states = PackageBatch([Package(name) for name in package_names], settings.JOBS).outdated()
+
+        for name, state in states.items():
+            match state:
+                case True:
+                    print(f"{name}: outdated")
+
+                case False:
+                    print(f"{name}: up to date")
+
+                case _:
+                    print(f"{name}: unknown")
+
+        return 0
+
+    if package_names.__len__() < 1:
+        PHOTON_LOGGER.warning("too few arguments")
+        return 1
+
+    if package_names.__len__() > 1 and settings.MODE not in batch_modes:
+        PHOTON_LOGGER.warning("mode only supports a single package")
+        return 1
+
+    # < packages to run > #
+    for name in package_names:
+        if name.endswith(".photon"):
+            PHOTON_LOGGER.info("using alternative package class")
+            settings.PACKAGES.append(PhotonPackage(name))
+        else:
+            settings.PACKAGES.append(Package(name))
+
     # < useful info for debugging > #
-    PHOTON_LOGGER.debug(f"running photon with args: {photon_args}")
+    PHOTON_LOGGER.debug(f"running photon with args: {photon_args} {photon_flags}")
     PHOTON_LOGGER.debug(settings)
     PHOTON_LOGGER.debug(f"running package with args: {package_args}")
 
+    # < several packages share one session and report a summary > #
+    if settings.PACKAGES.__len__() > 1:
+        from photon.lib.notify import coalesced, notify
+
+        batch = PackageBatch(settings.PACKAGES, settings.JOBS)
+
+        match settings.MODE:
+            case Mode.UPDATE:
+                batch.update()
+                action = "updated"
+
+            case Mode.INSTALL:
+                batch.install()
+                action = "installed"
+
+            case _:
+                batch.uninstall(package_args)
+                action = "uninstalled"
+
+        code = batch.summary()
+        done = [name for name, result in batch.getResults().items() if result == 0]
+
+        # < one notification for the whole batch > #
+        with coalesced(f"{done.__len__()} packages have been {action}"):
+            for name in done:
+                notify(f"{name} has been {action}")
+
+        return code
+
+    package: Package = settings.PACKAGES[0]
+
     # < run program in desired mode > #
     match settings.MODE:
         case Mode.RUN:
-            return package.run(package_args)
+            # < the package manifest decides unless told otherwise > #
+            in_process: bool | None = None
+
+            if "--in-process" in photon_flags:
+                in_process = True
+            elif "--subprocess" in photon_flags:
+                in_process = False
+
+            return package.run(package_args, in_process, "--no-daemon" not in photon_flags)
 
         case Mode.VERSION:
             return package.version()
@@ -187,6 +396,8 @@ def main() -> int:
             return package.help()
 
         case Mode.UPDATE:
+            from photon.lib.notify import notify
+
             if package.update():
                 return 1
             else:
@@ -194,6 +405,8 @@ def main() -> int:
                 return 0
 
         case Mode.INSTALL:
+            from photon.lib.notify import notify
+
             if package.install():
                 return 1
             else:
@@ -201,11 +414,22 @@ def main() -> int:
                 return 0
 
         case Mode.UNINSTALL:
+            from photon.lib.notify import notify
+
             if package.uninstall():
                 return 1
             else:
                 notify(f"{package.getInfo().NAME} has been uninstalled")
                 return 0
 
+        case Mode.ROLLBACK:
+            from photon.lib.notify import notify
+
+            if package.rollback():
+                return 1
+            else:
+                notify(f"{package.getInfo().NAME} has been rolled back")
+                return 0
+
 
 # < ----------------------------------------------------------------------- > #
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import shutil
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from photon import PHOTON_LOGGER
+
+
+if TYPE_CHECKING:
+    import requests
+
+    from photon.lib.package import Package
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < default number of concurrent downloads > #
+BATCH_JOBS: int = 4
+
+# < seconds to wait for an update check before giving up on a package > #
+PROBE_TIMEOUT: float = 10
+
+# < (url, request headers) -> (status code, response headers with lowercase names) > #
+# < the network layer used to check for updates, swappable for a local stand-in > #
+Probe = Callable[[str, dict[str, str]], tuple[int, dict[str, str]]]
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def _name(package: Package) -> str:
+    info = package.getInfo()
+    return info.RAW_NAME if info.RAW_NAME is not None else info.DIR_NAME
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def readPackageList(path: Path) -> list[str]:
+    """
+    read package names from a file, one per line \n
+    blank lines and lines starting with # are ignored
+    """
+
+    names: list[str] = []
+
+    for line in path.read_text().splitlines():
+        line = line.strip()
+
+        if line == "" or line.startswith("#"):
+            continue
+
+        names.append(line)
+
+    return names
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def sessionProbe(session: requests.Session, timeout: float = PROBE_TIMEOUT) -> Probe:
+    """
+    make a probe that sends HEAD requests over a shared session
+    """
+
+    def probe(url: str, headers: dict[str, str]) -> tuple[int, dict[str, str]]:
+        response = session.head(url, headers=headers, allow_redirects=True, timeout=timeout)
+        return response.status_code, {key.lower(): value for key, value in response.headers.items()}
+
+    return probe
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+class PackageBatch:
+    def __init__(self, packages: list[Package], jobs: int = BATCH_JOBS) -> None:
+        # < results and archives are keyed by name and every spelling of a package > #
+        # < shares one root, so each package is handled once > #
+        self._packages: list[Package] = []
+        dir_names: set[str] = set()
+
+        for package in packages:
+            dir_name: str = package.getInfo().DIR_NAME
+
+            if dir_name in dir_names:
+                PHOTON_LOGGER.warning(f"{_name(package)} given more than once, ignoring it")
+                continue
+
+            dir_names.add(dir_name)
+            self._packages.append(package)
+
+        self._jobs: int = max(1, jobs)
+        self._results: dict[str, int] = {}
+
+    # < ------------------------------------------------------------------- > #
+
+    def getResults(self) -> dict[str, int]:
+        """
+        get the return code of every package from the last operation
+        """
+
+        return self._results
+
+    # < ------------------------------------------------------------------- > #
+
+    def download(
+        self, packages: list[Package], skip_unchanged: bool = True
+    ) -> dict[str, Path | None]:
+        """
+        download and extract several packages concurrently over one session
+        """
+
+        import zipfile
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        import requests
+
+        archives: dict[str, Path | None] = {}
+
+        if packages.__len__() < 1:
+            return archives
+
+        with requests.Session() as session:
+            for package in packages:
+                package.setSession(session)
+
+            with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+                futures = {
+                    _name(package): executor.submit(package.download, skip_unchanged=skip_unchanged)
+                    for package in packages
+                }
+
+                for name, future in futures.items():
+                    try:
+                        archives[name] = future.result()
+                    except (requests.RequestException, OSError, zipfile.BadZipFile) as error:
+                        PHOTON_LOGGER.error(f"failed to download {name}:\n {error}")
+                        archives[name] = None
+
+            for package in packages:
+                package.setSession(None)
+
+        return archives
+
+    # < ------------------------------------------------------------------- > #
+
+    def install(self) -> dict[str, int]:
+        """
+        download every package concurrently, then install them one at a time
+        """
+
+        self._results = {}
+        pending: list[Package] = []
+
+        for package in self._packages:
+            name: str = _name(package)
+
+            if package.isInstalled():
+                PHOTON_LOGGER.error(f"{name} already installed")
+                self._results[name] = 1
+            else:
+                pending.append(package)
+
+        archives = self.download(pending, skip_unchanged=False)
+
+        # < before anything is swapped in, a failure leaves every package as it was > #
+        self.installDependencies(archives)
+
+        for package in pending:
+            name = _name(package)
+            archive: Path | None = archives.get(name)
+
+            if name in self._results:
+                continue
+
+            if archive is None:
+                self._results[name] = 1
+                continue
+
+            PHOTON_LOGGER.info(f"installing {name}")
+            self._results[name] = package.install(archive, True, False)
+
+        return self._results
+
+    # < ------------------------------------------------------------------- > #
+
+    def update(self) -> dict[str, int]:
+        """
+        download every package concurrently, then update them one at a time
+        """
+
+        self._results = {}
+        pending: list[Package] = []
+
+        for package in self._packages:
+            name: str = _name(package)
+
+            if not package.isInstalled():
+                PHOTON_LOGGER.error(f"cannot update {name}, not installed")
+                self._results[name] = 1
+            else:
+                pending.append(package)
+
+        archives = self.download(pending)
+
+        # < before anything is swapped in, a failure leaves every package as it was > #
+        self.installDependencies(archives)
+
+        for package in pending:
+            name = _name(package)
+            archive: Path | None = archives.get(name)
+
+            if name in self._results:
+                continue
+
+            if archive is None:
+                self._results[name] = 0 if package.isUpToDate() else 1
+                continue
+
+            PHOTON_LOGGER.info(f"updating {name}")
+            self._results[name] = package.update(archive, True, False)
+
+        return self._results
+
+    # < ------------------------------------------------------------------- > #
+
+    def installDependencies(self, archives: dict[str, Path | None]) -> int:
+        """
+        install the merged requirements of every downloaded package with one pip run \n
+        if pip fails every one of them is marked failed with its return code
+        """
+
+        from photon.lib.dependencies import installRequirements, readRequirements
+
+        extracted: dict[str, Path] = {
+            name: archive
+            for name, archive in archives.items()
+            if archive is not None and name not in self._results
+        }
+
+        if extracted.__len__() < 1:
+            return 0
+
+        returncode: int = installRequirements(
+            [
+                readRequirements(archive.joinpath("requirements.txt"))
+                for archive in extracted.values()
+            ]
+        )
+
+        if returncode != 0:
+            PHOTON_LOGGER.error("failed to install dependencies, keeping current versions")
+
+            # < nothing will be moved out of the extracted archives now > #
+            for name, archive in extracted.items():
+                self._results[name] = returncode
+                shutil.rmtree(archive, ignore_errors=True)
+
+        return returncode
+
+    # < ------------------------------------------------------------------- > #
+
+    def outdated(self, probe: Probe | None = None) -> dict[str, bool | None]:
+        """
+        check every package for upstream changes concurrently, nothing is downloaded \n
+        without a probe HEAD requests are sent over one pooled session \n
+        True means outdated, None that it could not be told
+        """
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        import requests
+
+        from requests.adapters import HTTPAdapter
+
+        states: dict[str, bool | None] = {}
+
+        if self._packages.__len__() < 1:
+            return states
+
+        with requests.Session() as session:
+            # < one pooled connection per worker > #
+            session.mount("https://", HTTPAdapter(pool_maxsize=self._jobs))
+
+            check: Probe = probe if probe is not None else sessionProbe(session)
+
+            with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+                futures = {
+                    _name(package): executor.submit(package.isOutdated, check)
+                    for package in self._packages
+                }
+
+                for name, future in futures.items():
+                    try:
+                        states[name] = future.result()
+                    except (requests.RequestException, OSError) as error:
+                        PHOTON_LOGGER.error(f"failed to check {name}:\n {error}")
+                        states[name] = None
+
+        return states
+
+    # < ------------------------------------------------------------------- > #
+
+    def uninstall(self, extra_args: list[str] | None = None) -> dict[str, int]:
+        """
+        uninstall every package one at a time
+        """
+
+        if extra_args is None:
+            extra_args = []
+
+        self._results = {}
+
+        for package in self._packages:
+            name: str = _name(package)
+
+            PHOTON_LOGGER.info(f"uninstalling {name}")
+            self._results[name] = package.uninstall(extra_args)
+
+        return self._results
+
+    # < ------------------------------------------------------------------- > #
+
+    def summary(self) -> int:
+        """
+        log the result of every package, returns 0 only if all succeeded
+        """
+
+        failed: int = 0
+
+        PHOTON_LOGGER.info("summary:")
+
+        for name, code in self._results.items():
+            if code == 0:
+                PHOTON_LOGGER.info(f"  - {name}: ok")
+            else:
+                PHOTON_LOGGER.error(f"  - {name}: failed ({code})")
+                failed = failed + 1
+
+        return 0 if failed == 0 else 1
+
+    # < ------------------------------------------------------------------- > #
+
+
+# < ----------------------------------------------------------------------- > #
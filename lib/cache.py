@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from photon import PHOTON_LOGGER
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < total size of all cached archives before the least recently used are evicted > #
+CACHE_MAX_SIZE: int = 1024 * 1024 * 512
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+@dataclass
+class CacheEntry:
+    # fmt:off
+    SHA256        : str
+    SIZE          : int
+    ETAG          : str | None
+    LAST_MODIFIED : str | None
+    LAST_USED     : float
+    # fmt:on
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+class ArchiveCache:
+    # < shared by every instance so concurrent downloads do not lose index updates > #
+    _lock: threading.Lock = threading.Lock()
+
+    def __init__(self, path: Path, max_size: int = CACHE_MAX_SIZE) -> None:
+        self._path: Path = path
+        self._index_file: Path = path.joinpath("index.json")
+        self._max_size: int = max_size
+        self._entries: dict[str, CacheEntry] = {}
+
+        self._path.mkdir(parents=True, exist_ok=True)
+        self.reloadIndex()
+
+    # < ------------------------------------------------------------------- > #
+
+    def reloadIndex(self) -> None:
+        """
+        reload the index from disk, dropping entries whose archive is missing
+        """
+
+        self._entries = {}
+
+        if not self._index_file.exists():
+            return None
+
+        try:
+            raw: dict[str, dict[str, Any]] = json.loads(self._index_file.read_text())
+        except (OSError, ValueError) as error:
+            PHOTON_LOGGER.warning(f"invalid cache index, starting fresh:\n {error}")
+            return None
+
+        for key, value in raw.items():
+            try:
+                entry = CacheEntry(**value)
+            except TypeError:
+                PHOTON_LOGGER.debug(f"dropping malformed cache entry: {key}")
+                continue
+
+            if self.archivePath(entry.SHA256).exists():
+                self._entries[key] = entry
+
+    # < ------------------------------------------------------------------- > #
+
+    def writeIndex(self) -> None:
+        """
+        write the index to disk
+        """
+
+        raw = {key: asdict(entry) for key, entry in self._entries.items()}
+
+        fd, tmp = tempfile.mkstemp(dir=self._path, suffix=".json")
+
+        with os.fdopen(fd, "w") as fp:
+            json.dump(raw, fp, indent=4)
+
+        os.replace(tmp, self._index_file)
+
+    # < ------------------------------------------------------------------- > #
+
+    def archivePath(self, sha256: str) -> Path:
+        """
+        get the path of an archive from its content hash
+        """
+
+        return self._path.joinpath(f"{sha256}.zip")
+
+    # < ------------------------------------------------------------------- > #
+
+    def get(self, key: str) -> CacheEntry | None:
+        """
+        get the cache entry for a package, if any
+        """
+
+        return self._entries.get(key)
+
+    # < ------------------------------------------------------------------- > #
+
+    def headers(self, key: str) -> dict[str, str]:
+        """
+        get the conditional request headers for a package
+        """
+
+        headers: dict[str, str] = {}
+        entry: CacheEntry | None = self.get(key)
+
+        if entry is None:
+            return headers
+
+        if entry.ETAG is not None:
+            headers["If-None-Match"] = entry.ETAG
+
+        if entry.LAST_MODIFIED is not None:
+            headers["If-Modified-Since"] = entry.LAST_MODIFIED
+
+        return headers
+
+    # < ------------------------------------------------------------------- > #
+
+    def touch(self, key: str) -> Path | None:
+        """
+        mark a package as recently used and get its archive
+        """
+
+        with self._lock:
+            self.reloadIndex()
+            entry: CacheEntry | None = self.get(key)
+
+            if entry is None:
+                return None
+
+            entry.LAST_USED = time.time()
+            self.writeIndex()
+
+        return self.archivePath(entry.SHA256)
+
+    # < ------------------------------------------------------------------- > #
+
+    def store(
+        self,
+        key: str,
+        chunks: Iterable[bytes],
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> Path:
+        """
+        write an archive into the cache and return its path \n
+        the archive is hashed while it is written, identical archives share one file
+        """
+
+        sha256 = hashlib.sha256()
+        size: int = 0
+
+        fd, tmp = tempfile.mkstemp(dir=self._path, suffix=".part")
+
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                for chunk in chunks:
+                    sha256.update(chunk)
+                    fp.write(chunk)
+                    size = size + chunk.__len__()
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        digest: str = sha256.hexdigest()
+        archive: Path = self.archivePath(digest)
+
+        with self._lock:
+            os.replace(tmp, archive)
+            PHOTON_LOGGER.debug(f"cached {size} bytes as {archive.name}")
+
+            self.reloadIndex()
+
+            previous: CacheEntry | None = self._entries.get(key)
+            self._entries[key] = CacheEntry(digest, size, etag, last_modified, time.time())
+
+            # < drop the superseded archive unless another package shares it > #
+            if (
+                previous is not None
+                and previous.SHA256 != digest
+                and not any(other.SHA256 == previous.SHA256 for other in self._entries.values())
+            ):
+                self.archivePath(previous.SHA256).unlink(missing_ok=True)
+
+            self.evict(keep=key)
+            self.writeIndex()
+
+        return archive
+
+    # < ------------------------------------------------------------------- > #
+
+    def evict(self, keep: str | None = None) -> None:
+        """
+        remove the least recently used archives until the cache fits in max_size \n
+        the entry for keep is never evicted
+        """
+
+        sizes: dict[str, int] = {}
+
+        for entry in self._entries.values():
+            sizes[entry.SHA256] = entry.SIZE
+
+        total: int = sum(sizes.values())
+
+        if total <= self._max_size:
+            return None
+
+        for key, entry in sorted(self._entries.items(), key=lambda item: item[1].LAST_USED):
+            if total <= self._max_size:
+                break
+
+            if key == keep:
+                continue
+
+            del self._entries[key]
+            PHOTON_LOGGER.debug(f"evicting cached archive for {key}")
+
+            # < only delete the file once nothing else references it > #
+            if any(other.SHA256 == entry.SHA256 for other in self._entries.values()):
+                continue
+
+            self.archivePath(entry.SHA256).unlink(missing_ok=True)
+            total = total - entry.SIZE
+
+    # < ------------------------------------------------------------------- > #
+
+
+# < ----------------------------------------------------------------------- > #
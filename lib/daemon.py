@@ -0,0 +1,372 @@
+import importlib
+import json
+import os
+import signal
+import stat
+import struct
+import sys
+import tempfile
+
+from pathlib import Path
+from types import FrameType
+from typing import TYPE_CHECKING
+
+from photon import PHOTON_LOGGER
+
+
+if TYPE_CHECKING:
+    import socket
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < modules most packages spend their startup importing > #
+DAEMON_PRELOAD: list[str] = [
+    "PySide6.QtCore",
+    "PySide6.QtGui",
+    "PySide6.QtWidgets",
+    "photon.lib.gui.qt",
+    "photon.lib.package",
+    "requests",
+]
+
+# < largest request a client may send, mostly its environment > #
+DAEMON_MAX_REQUEST: int = 1024 * 1024
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def socketDir() -> Path:
+    """
+    get the private directory the daemons socket lives in, one per user
+    """
+
+    runtime_dir: str = os.environ.get("XDG_RUNTIME_DIR", tempfile.gettempdir())
+
+    return Path(runtime_dir).joinpath(f"photon-{os.getuid()}")
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def socketPath() -> Path:
+    """
+    get the path of the daemons unix socket
+    """
+
+    return socketDir().joinpath("daemon.sock")
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def isPrivateDir(path: Path) -> bool:
+    """
+    check a directory is a real directory owned by us that nobody else can enter \n
+    the fallback runtime dir is shared, so anyone could have created it first
+    """
+
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        PHOTON_LOGGER.warning(f"{path} is not a directory owned by us, ignoring it")
+        return False
+
+    if info.st_mode & 0o077 != 0:
+        PHOTON_LOGGER.warning(f"{path} is accessible by other users, ignoring it")
+        return False
+
+    return True
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def peerUid(sock: "socket.socket") -> int | None:
+    """
+    get the uid of the process on the other end of a unix socket \n
+    None where SO_PEERCRED is not supported
+    """
+
+    import socket
+
+    option: int | None = getattr(socket, "SO_PEERCRED", None)
+
+    if option is None:
+        return None
+
+    try:
+        # < struct ucred is pid, uid, gid > #
+        _, uid, _ = struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, option, 12))
+    except OSError as error:
+        PHOTON_LOGGER.debug(f"could not get peer credentials: {error}")
+        return None
+
+    return uid
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def preload(modules: list[str]) -> None:
+    """
+    import modules so forked children start with them already loaded
+    """
+
+    for module in modules:
+        try:
+            importlib.import_module(module)
+            PHOTON_LOGGER.debug(f"preloaded {module}")
+        except ImportError as error:
+            PHOTON_LOGGER.debug(f"could not preload {module}: {error}")
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def runChild(conn: "socket.socket", request: dict[str, object], fds: list[int]) -> int:
+    """
+    run a requested package inside a freshly forked child of the daemon \n
+    the clients stdin, stdout and stderr replace our own before running
+    """
+
+    from photon.lib.package import Package
+
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    for target, fd in enumerate(fds[:3]):
+        os.dup2(fd, target)
+
+    for fd in fds:
+        os.close(fd)
+
+    # < log as the client would, not at the level and format the daemon was started with > #
+    PHOTON_LOGGER.resetAfterFork()
+
+    level = request.get("log_level")
+    if isinstance(level, int):
+        PHOTON_LOGGER.setLevel(level)
+
+    PHOTON_LOGGER.setFormat(str(request.get("log_format", "text")))
+
+    os.chdir(str(request["cwd"]))
+
+    env = request["env"]
+    if isinstance(env, dict):
+        os.environ.clear()
+        os.environ.update(env)
+
+    conn.sendall(f"pid {os.getpid()}\n".encode())
+
+    code: int = 1
+    args = request["args"]
+
+    try:
+        package = Package(str(request["package"]))
+        code = package.runModule([str(arg) for arg in args] if isinstance(args, list) else [])
+    except Exception:
+        import traceback
+
+        traceback.print_exc()
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    conn.sendall(f"exit {code}\n".encode())
+
+    return code
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def serve(extra_preload: list[str] | None = None) -> int:
+    """
+    keep a warm interpreter and fork a child for every run request
+    """
+
+    import socket
+
+    if extra_preload is None:
+        extra_preload = []
+
+    if sys.platform == "win32":
+        PHOTON_LOGGER.error("the daemon is not supported on windows")
+        return 1
+
+    if getattr(socket, "SO_PEERCRED", None) is None:
+        PHOTON_LOGGER.error("the daemon needs SO_PEERCRED to check who connects to it")
+        return 1
+
+    directory: Path = socketDir()
+
+    try:
+        directory.mkdir(mode=0o700, exist_ok=True)
+    except OSError as error:
+        PHOTON_LOGGER.error(f"could not create {directory}: {error}")
+        return 1
+
+    if not isPrivateDir(directory):
+        return 1
+
+    path: Path = socketPath()
+
+    # < a socket nobody answers on is left over from a previous daemon > #
+    if path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            probe.connect(str(path))
+            PHOTON_LOGGER.error(f"daemon already running on {path}")
+            return 1
+        except OSError:
+            path.unlink()
+        finally:
+            probe.close()
+
+    preload(DAEMON_PRELOAD + extra_preload)
+
+    # < children are reaped by the kernel, they report back over the socket > #
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    # < the socket is created 0600, there is no window before a chmod > #
+    umask: int = os.umask(0o177)
+
+    try:
+        server.bind(str(path))
+    finally:
+        os.umask(umask)
+
+    server.listen()
+
+    PHOTON_LOGGER.info(f"daemon listening on {path}")
+
+    try:
+        while True:
+            conn, _ = server.accept()
+
+            with conn:
+                if peerUid(conn) != os.getuid():
+                    PHOTON_LOGGER.warning("refusing a connection from another user")
+                    continue
+
+                try:
+                    data, fds, _, _ = socket.recv_fds(conn, DAEMON_MAX_REQUEST, 3)
+                    request: dict[str, object] = json.loads(data)
+                except (OSError, ValueError) as error:
+                    PHOTON_LOGGER.warning(f"invalid request: {error}")
+                    continue
+
+                PHOTON_LOGGER.debug(f"running {request.get('package')}")
+
+                sys.stdout.flush()
+                sys.stderr.flush()
+
+                if os.fork() == 0:
+                    # < the child must never return into this loop, its finally removes the socket > #
+                    code: int = 1
+
+                    try:
+                        server.close()
+                        code = runChild(conn, request, fds)
+                    except BaseException:
+                        import traceback
+
+                        traceback.print_exc()
+                    finally:
+                        os._exit(code)
+
+                for fd in fds:
+                    os.close(fd)
+    except KeyboardInterrupt:
+        PHOTON_LOGGER.info("daemon stopping")
+    finally:
+        server.close()
+        path.unlink(missing_ok=True)
+
+    return 0
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def runRemote(package: str, args: list[str]) -> int | None:
+    """
+    ask a running daemon to run a package with our stdio \n
+    returns None if no daemon is available so the caller can run it itself
+    """
+
+    if sys.platform == "win32":
+        return None
+
+    path: Path = socketPath()
+
+    if not path.exists() or not isPrivateDir(path.parent):
+        return None
+
+    import socket
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+
+    # < our stdio and environment only go to a daemon run by us > #
+    if peerUid(sock) != os.getuid():
+        PHOTON_LOGGER.warning(f"{path} is not served by us, running locally")
+        sock.close()
+        return None
+
+    PHOTON_LOGGER.debug(f"running {package} through the daemon")
+
+    request: dict[str, object] = {
+        "package": package,
+        "args": args,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "log_level": PHOTON_LOGGER.root.level,
+        "log_format": PHOTON_LOGGER.log_format,
+    }
+
+    pid: int | None = None
+
+    # < signals go to the child running the package, not the daemon > #
+    def forward(signum: int, frame: FrameType | None) -> None:
+        if pid is not None:
+            os.kill(pid, signum)
+
+    with sock:
+        socket.send_fds(sock, [json.dumps(request).encode()], [0, 1, 2])
+
+        previous_int = signal.signal(signal.SIGINT, forward)
+        previous_term = signal.signal(signal.SIGTERM, forward)
+
+        try:
+            for line in sock.makefile("r"):
+                key, _, value = line.strip().partition(" ")
+
+                if key == "pid":
+                    pid = int(value)
+                elif key == "exit":
+                    return int(value)
+        finally:
+            signal.signal(signal.SIGINT, previous_int)
+            signal.signal(signal.SIGTERM, previous_term)
+
+    PHOTON_LOGGER.error("daemon closed the connection before the package exited")
+    return 1
+
+
+# < ----------------------------------------------------------------------- > #
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from pathlib import Path
+
+from photon import PHOTON_LOGGER
+from photon.lib.paths import sharedPaths
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < how many previously installed requirement sets to remember > #
+RESOLVED_HISTORY: int = 64
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def _nestedFile(line: str) -> tuple[str | None, str]:
+    for option, short in [
+        ("--requirement", "-r"),
+        ("--constraint", "-c"),
+        ("-r", "-r"),
+        ("-c", "-c"),
+    ]:
+        for separator in [" ", "="]:
+            if line.startswith(option + separator):
+                return short, line.removeprefix(option + separator).strip()
+
+    return None, line
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def readRequirements(path: Path, seen: set[Path] | None = None) -> list[str]:
+    """
+    read the requirements from a requirements.txt \n
+    comments and blank lines are dropped, nested requirement files are inlined so
+    nothing refers back into the archive once it is cleaned up, constraint files are
+    made absolute
+    """
+
+    requirements: list[str] = []
+
+    if not path.exists():
+        return requirements
+
+    # < guards against files that include each other > #
+    seen = seen if seen is not None else set()
+    seen.add(path.resolve())
+
+    for line in path.read_text().splitlines():
+        line = line.split(" #", 1)[0].strip()
+
+        if line == "" or line.startswith("#"):
+            continue
+
+        option, nested = _nestedFile(line)
+
+        # < nested files are relative to this file > #
+        if option == "-r":
+            nested_path: Path = path.parent.joinpath(nested)
+
+            if nested_path.resolve() not in seen:
+                requirements.extend(readRequirements(nested_path, seen))
+
+            continue
+
+        if option == "-c":
+            line = f"-c {path.parent.joinpath(nested).as_posix()}"
+
+        requirements.append(line)
+
+    return requirements
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def mergeRequirements(groups: list[list[str]]) -> list[str]:
+    """
+    merge the requirements of several packages into one deduplicated list, keeping order
+    """
+
+    merged: dict[str, None] = {}
+
+    for group in groups:
+        for requirement in group:
+            merged[" ".join(requirement.split())] = None
+
+    return list(merged)
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def hashRequirements(requirements: list[str]) -> str:
+    """
+    hash a set of requirements together with the interpreter they are for \n
+    constraint files are hashed by content, a changed file is a changed set
+    """
+
+    sha256 = hashlib.sha256(sys.executable.encode())
+
+    for requirement in sorted(requirements):
+        sha256.update(b"\n")
+        sha256.update(requirement.encode())
+
+        option, nested = _nestedFile(requirement)
+
+        if option is None:
+            continue
+
+        try:
+            sha256.update(Path(nested).read_bytes())
+        except OSError:
+            PHOTON_LOGGER.debug(f"could not read {nested} to hash it")
+
+    return sha256.hexdigest()
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def resolvedFile() -> Path:
+    """
+    get the file the hashes of installed requirement sets are stored in
+    """
+
+    return sharedPaths("photon").settings().joinpath("dependencies.json")
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def readResolved() -> list[str]:
+    """
+    get the hashes of requirement sets that were already installed
+    """
+
+    path = resolvedFile()
+
+    if not path.exists():
+        return []
+
+    try:
+        resolved: list[str] = json.loads(path.read_text()).get("resolved", [])
+    except (OSError, ValueError, AttributeError):
+        PHOTON_LOGGER.debug("invalid dependency cache, ignoring")
+        return []
+
+    return resolved
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def writeResolved(digest: str) -> None:
+    """
+    remember a requirement set as installed
+    """
+
+    resolved: list[str] = [entry for entry in readResolved() if entry != digest]
+    resolved.append(digest)
+
+    path = resolvedFile()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"resolved": resolved[-RESOLVED_HISTORY:]}, indent=4))
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def installRequirements(groups: list[list[str]], force: bool = False) -> int:
+    """
+    install the requirements of several packages with a single pip invocation \n
+    pip is skipped entirely if the same set was already installed, unless forced
+    """
+
+    requirements: list[str] = mergeRequirements(groups)
+
+    if requirements.__len__() < 1:
+        PHOTON_LOGGER.info("no dependencies to install")
+        return 0
+
+    digest: str = hashRequirements(requirements)
+
+    if not force and digest in readResolved():
+        PHOTON_LOGGER.info("dependencies unchanged, skipping pip")
+        return 0
+
+    PHOTON_LOGGER.info("installing dependencies...")
+    PHOTON_LOGGER.debug(f"requirements: {requirements}")
+
+    fd, tmp = tempfile.mkstemp(suffix=".txt", text=True)
+
+    try:
+        with os.fdopen(fd, "w") as fp:
+            fp.write("\n".join(requirements) + "\n")
+
+        install_args = [sys.executable, "-m", "pip", "install", "-r", tmp]
+        process = subprocess.run(install_args)
+    finally:
+        os.unlink(tmp)
+
+    if process.returncode != 0:
+        PHOTON_LOGGER.error("failed to install dependencies")
+        return process.returncode
+
+    writeResolved(digest)
+
+    return 0
+
+
+# < ----------------------------------------------------------------------- > #
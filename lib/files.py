@@ -0,0 +1,198 @@
+import atexit
+import copy
+import os
+import stat
+import tempfile
+import threading
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from photon import PHOTON_LOGGER
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < default seconds rapid changes are collected for before being written together > #
+WRITE_DELAY: float = 0.5
+
+# < parsed toml files, keyed by path and checked against (mtime_ns, size) > #
+_toml_cache: dict[Path, tuple[tuple[int, int], dict[str, Any]]] = {}
+_toml_lock: threading.Lock = threading.Lock()
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def fileStamp(path: Path) -> tuple[int, int] | None:
+    """
+    get the (mtime_ns, size) of a file, None if it does not exist \n
+    a file counts as unchanged while its stamp is
+    """
+
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def readToml(path: Path) -> dict[str, Any]:
+    """
+    parse a toml file with tomllib, reusing the result while its stamp is unchanged \n
+    every caller gets its own copy
+    """
+
+    import tomllib
+
+    key: tuple[int, int] | None = fileStamp(path)
+
+    if key is None:
+        raise FileNotFoundError(path)
+
+    with _toml_lock:
+        cached = _toml_cache.get(path)
+
+    if cached is not None and cached[0] == key:
+        return copy.deepcopy(cached[1])
+
+    with open(path, "rb") as fp:
+        data: dict[str, Any] = tomllib.load(fp)
+
+    PHOTON_LOGGER.debug(f"parsed {path}")
+
+    with _toml_lock:
+        _toml_cache[path] = (key, data)
+
+    return copy.deepcopy(data)
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def writeAtomic(path: Path, text: str) -> bool:
+    """
+    write text to a file through a temporary file and os.replace \n
+    readers see either the old or the new content, never a partial write \n
+    nothing is written if the file already holds the same content, returns if it wrote
+    """
+
+    data: bytes = text.encode()
+    stamp: tuple[int, int] | None = fileStamp(path)
+
+    # < the size check avoids reading the file back for most changes > #
+    if stamp is not None and stamp[1] == data.__len__():
+        try:
+            if path.read_bytes() == data:
+                PHOTON_LOGGER.debug(f"{path} unchanged, skipping write")
+                return False
+        except OSError:
+            pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+
+    try:
+        # < mkstemp makes the file 0600, os.replace would carry that over the original > #
+        if stamp is not None:
+            os.fchmod(fd, stat.S_IMODE(os.stat(path).st_mode))
+
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+            fp.flush()
+            os.fsync(fp.fileno())
+
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    return True
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+class DebouncedWriter:
+    def __init__(self, delay: float = WRITE_DELAY) -> None:
+        self._delay: float = delay
+        self._lock: threading.Lock = threading.Lock()
+        self._pending: dict[str, Callable[[], object]] = {}
+        self._timer: threading.Timer | None = None
+
+        # < nothing scheduled is lost when the interpreter exits > #
+        atexit.register(self.flush)
+
+    # < ------------------------------------------------------------------- > #
+
+    def schedule(self, key: str, write: Callable[[], object]) -> None:
+        """
+        run write on a background thread once delay seconds have passed \n
+        writes scheduled under the same key before then replace each other,
+        so a burst of changes costs a single write
+        """
+
+        with self._lock:
+            self._pending[key] = write
+
+            if self._timer is None:
+                self._timer = threading.Timer(self._delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    # < ------------------------------------------------------------------- > #
+
+    def flush(self) -> None:
+        """
+        run every pending write now \n
+        a write that fails on the filesystem is put back and retried on the next flush,
+        unless a newer one was scheduled under its key in the meantime, one whose value
+        cannot be serialised is dropped
+        """
+
+        with self._lock:
+            pending: dict[str, Callable[[], object]] = self._pending
+            self._pending = {}
+
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        for key, write in pending.items():
+            try:
+                write()
+            except OSError as error:
+                PHOTON_LOGGER.error(f"failed to write {key}, will retry:\n {error}")
+
+                with self._lock:
+                    self._pending.setdefault(key, write)
+            except (TypeError, ValueError) as error:
+                # < the value itself cannot be written, retrying would fail the same way > #
+                PHOTON_LOGGER.error(f"failed to write {key}, dropping it:\n {error}")
+
+    # < ------------------------------------------------------------------- > #
+
+    def close(self) -> None:
+        """
+        flush and stop flushing at exit, writes that still fail are dropped
+        """
+
+        self.flush()
+        atexit.unregister(self.flush)
+
+        with self._lock:
+            for key in self._pending:
+                PHOTON_LOGGER.error(f"dropping unwritten {key}")
+
+            self._pending = {}
+
+    # < ------------------------------------------------------------------- > #
+
+
+# < ----------------------------------------------------------------------- > #
@@ -1,15 +1,228 @@
+import json
+import os
+import struct
+
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from typing import Any
 
 from photon import PHOTON_LOGGER
+from photon.lib.files import writeAtomic
+from photon.lib.paths import sharedPaths
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < bumped whenever FontEntry changes so older scans are redone > #
+FONT_INDEX_VERSION: int = 2
+
+# < formats in the order they are preferred when one face ships in several > #
+# < plain sfnt files are mapped by qt as they are, woff and woff2 must be unpacked first > #
+FONT_FORMAT_PREFERENCE: list[str] = ["ttf", "otf", "woff", "woff2"]
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+@dataclass
+class FontEntry:
+    # fmt:off
+    PATH     : str
+    STEM     : str
+    FORMAT   : str
+    SIZE     : int
+    MTIME    : int
+    FAMILY   : str | None = None
+    STYLE    : str | None = None
+    VARIABLE : bool       = False
+    # fmt:on
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def fontIndexFile() -> Path:
+    """
+    get the file font directory scans are cached in
+    """
+
+    return sharedPaths("photon").settings().joinpath("fonts.json")
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def _decodeName(platform_id: int, data: bytes) -> str | None:
+    try:
+        if platform_id == 1:
+            return data.decode("mac_roman")
+
+        return data.decode("utf-16-be")
+    except UnicodeDecodeError:
+        return None
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def readFontNames(path: Path) -> tuple[str | None, str | None, bool]:
+    """
+    get the family and style from the name table of a ttf, otf or woff file and
+    whether it is a variable font \n
+    woff2 needs brotli to unpack so it, like anything unreadable, gives None
+    """
+
+    import zlib
+
+    try:
+        with open(path, "rb") as fp:
+            header: bytes = fp.read(12)
+            tables: dict[bytes, tuple[int, int, int]] = {}
+
+            # < woff: table directory entries are tag, offset, compressed and original length > #
+            if header[:4] == b"wOFF":
+                fp.seek(12)
+                count: int = struct.unpack(">H", fp.read(2))[0]
+                fp.seek(44)
+
+                for _ in range(count):
+                    tag, offset, length, original, _ = struct.unpack(">4sIIII", fp.read(20))
+                    tables[tag] = (offset, length, original)
+            elif header[:4] in [b"\x00\x01\x00\x00", b"OTTO", b"true"]:
+                count = struct.unpack(">H", header[4:6])[0]
+
+                for _ in range(count):
+                    tag, _, offset, length = struct.unpack(">4sIII", fp.read(16))
+                    tables[tag] = (offset, length, length)
+            else:
+                return None, None, False
+
+            if b"name" not in tables:
+                return None, None, b"fvar" in tables
+
+            offset, length, original = tables[b"name"]
+            fp.seek(offset)
+            name: bytes = fp.read(length)
+
+        if length < original:
+            name = zlib.decompress(name)
+
+        _, records, strings = struct.unpack(">HHH", name[:6])
+        names: dict[int, tuple[int, str]] = {}
+
+        for index in range(records):
+            platform_id, _, language_id, name_id, size, start = struct.unpack(
+                ">HHHHHH", name[6 + index * 12 : 18 + index * 12]
+            )
+
+            if name_id not in [1, 2, 16, 17]:
+                continue
+
+            # < windows english first, then any unicode, then mac > #
+            rank: int = {3: 0, 0: 1, 1: 2}.get(platform_id, 3)
+
+            if platform_id == 3 and language_id != 0x409:
+                rank = 1
+
+            if name_id in names and names[name_id][0] <= rank:
+                continue
+
+            value = _decodeName(platform_id, name[strings + start : strings + start + size])
+
+            if value is not None:
+                names[name_id] = (rank, value)
+    except (OSError, struct.error, zlib.error) as error:
+        PHOTON_LOGGER.debug(f"could not read font names from {path}: {error}")
+        return None, None, False
+
+    # < typographic names group every weight under one family, fall back to legacy ones > #
+    family = names.get(16, names.get(1, (0, None)))[1]
+    style = names.get(17, names.get(2, (0, None)))[1]
+
+    return family, style, b"fvar" in tables
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def _isItalic(style: str | None) -> bool:
+    return style is not None and any(word in style.lower() for word in ["italic", "oblique"])
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def preferredFonts(entries: list[FontEntry]) -> list[FontEntry]:
+    """
+    keep one file per face, a face being a family and style from the name table,
+    or the file name where the name table could not be read \n
+    variable fonts are preferred, then formats in FONT_FORMAT_PREFERENCE order \n
+    a variable font replaces every static file of its family with the same slant,
+    so an upright variable font still leaves static italics in place
+    """
+
+    def rank(entry: FontEntry) -> tuple[int, int, str]:
+        try:
+            format_rank: int = FONT_FORMAT_PREFERENCE.index(entry.FORMAT)
+        except ValueError:
+            format_rank = FONT_FORMAT_PREFERENCE.__len__()
+
+        return (0 if entry.VARIABLE else 1, format_rank, entry.PATH)
+
+    kept: list[FontEntry] = []
+    faces: set[tuple[str, str]] = set()
+    stems: set[str] = set()
+
+    # < (family, italic) of every variable font > #
+    variable: set[tuple[str, bool]] = {
+        (entry.FAMILY.lower(), _isItalic(entry.STYLE))
+        for entry in entries
+        if entry.VARIABLE and entry.FAMILY is not None
+    }
+
+    for entry in sorted(entries, key=rank):
+        face: tuple[str, str] | None = None
+
+        if (
+            not entry.VARIABLE
+            and entry.FAMILY is not None
+            and (entry.FAMILY.lower(), _isItalic(entry.STYLE)) in variable
+        ):
+            PHOTON_LOGGER.debug(f"skipping static font covered by a variable one: {entry.PATH}")
+
+            # < so the same file in formats without readable names is skipped too > #
+            stems.add(entry.STEM)
+            continue
+
+        # < a variable font covers a range of styles, its named style is only the default > #
+        if entry.FAMILY is not None and entry.STYLE is not None and not entry.VARIABLE:
+            face = (entry.FAMILY.lower(), entry.STYLE.lower())
+
+        # < the same stem in another format is the same face, even without names > #
+        if entry.STEM in stems or (face is not None and face in faces):
+            PHOTON_LOGGER.debug(f"skipping duplicate font: {entry.PATH}")
+            continue
+
+        stems.add(entry.STEM)
+
+        if face is not None:
+            faces.add(face)
+
+        kept.append(entry)
+
+    return kept
 
 
 # < ----------------------------------------------------------------------- > #
 
 
 class FontVault:
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path, use_index: bool = True) -> None:
         self.supported_formats: list[str] = ["otf", "ttf", "woff", "woff2"]
         self.fonts: dict[str, Path] = {}
+        self.entries: dict[str, FontEntry] = {}
+        self.use_index: bool = use_index
 
         if path.exists():
             self.loadFromPath(path)
@@ -28,17 +241,153 @@ class FontVault:
 
     def loadFromPath(self, path: Path) -> None:
         """
-        recursively search for fonts in the given path
+        recursively search for fonts in the given path \n
+        with the index a previous scan is reused while no directory under path has
+        changed, so a warm start costs one stat per directory instead of a walk \n
+        a face shipped in several formats is only added once, see preferredFonts
         """
 
         if not path.exists():
             return None
 
-        for entry in path.iterdir():
-            if entry.is_dir():
-                self.loadFromPath(entry)
-            elif entry.is_file():
-                self.filterFile(entry)
+        entries: list[FontEntry] | None = None
+
+        if self.use_index:
+            entries = self.readIndex(path)
+
+        if entries is None:
+            entries, dirs = self.scanPath(path)
+
+            if self.use_index:
+                self.writeIndex(path, entries, dirs)
+
+        for entry in preferredFonts(entries):
+            self.addFont(entry)
+
+    # < ------------------------------------------------------------------- > #
+
+    def scanPath(self, path: Path) -> tuple[list[FontEntry], dict[str, int]]:
+        """
+        walk path with os.scandir and get every supported font along with the
+        mtime of every directory visited
+        """
+
+        entries: list[FontEntry] = []
+        dirs: dict[str, int] = {}
+        pending: list[str] = [str(path)]
+
+        while pending.__len__() > 0:
+            current: str = pending.pop()
+
+            try:
+                dirs[current] = os.stat(current).st_mtime_ns
+
+                with os.scandir(current) as iterator:
+                    for item in iterator:
+                        if item.is_dir():
+                            pending.append(item.path)
+                            continue
+
+                        stem, dot, extension = item.name.rpartition(".")
+
+                        # < without a dot rpartition puts the whole name in extension > #
+                        if dot == "" or stem == "":
+                            continue
+
+                        if extension not in self.supported_formats or not item.is_file():
+                            continue
+
+                        stat = item.stat()
+                        family, style, variable = readFontNames(Path(item.path))
+                        entries.append(
+                            FontEntry(
+                                item.path,
+                                stem,
+                                extension,
+                                stat.st_size,
+                                stat.st_mtime_ns,
+                                family,
+                                style,
+                                variable,
+                            )
+                        )
+            except OSError as error:
+                PHOTON_LOGGER.debug(f"could not scan {current}: {error}")
+
+        # < keep the order stable between scans > #
+        entries.sort(key=lambda entry: entry.PATH)
+
+        PHOTON_LOGGER.debug(f"scanned {dirs.__len__()} directories under {path}")
+
+        return entries, dirs
+
+    # < ------------------------------------------------------------------- > #
+
+    def readIndex(self, path: Path) -> list[FontEntry] | None:
+        """
+        get the fonts under path from the index \n
+        None if path was never indexed or any directory under it changed since
+        """
+
+        index_file: Path = fontIndexFile()
+
+        try:
+            cached: dict[str, Any] = json.loads(index_file.read_text())[str(path)]
+
+            if cached.get("version") != FONT_INDEX_VERSION:
+                return None
+
+            dirs: dict[str, int] = cached["dirs"]
+            entries = [FontEntry(**entry) for entry in cached["fonts"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        for directory, mtime in dirs.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    PHOTON_LOGGER.debug(f"{directory} changed, rescanning fonts")
+                    return None
+            except OSError:
+                return None
+
+        return entries
+
+    # < ------------------------------------------------------------------- > #
+
+    def writeIndex(self, path: Path, entries: list[FontEntry], dirs: dict[str, int]) -> None:
+        """
+        store a scan of path in the index, alongside the scans of other paths
+        """
+
+        index_file: Path = fontIndexFile()
+        index: dict[str, Any] = {}
+
+        try:
+            index = json.loads(index_file.read_text())
+        except (OSError, ValueError):
+            pass
+
+        index[str(path)] = {
+            "version": FONT_INDEX_VERSION,
+            "dirs": dirs,
+            "fonts": [asdict(entry) for entry in entries],
+        }
+
+        try:
+            writeAtomic(index_file, json.dumps(index, indent=4, sort_keys=True))
+        except OSError as error:
+            PHOTON_LOGGER.debug(f"could not write the font index: {error}")
+
+    # < ------------------------------------------------------------------- > #
+
+    def addFont(self, entry: FontEntry) -> None:
+        """
+        add an indexed font to the internal dict
+        """
+
+        PHOTON_LOGGER.debug(f"adding new font: {entry.STEM} from {entry.PATH}")
+        self.fonts[entry.STEM] = Path(entry.PATH)
+        self.entries[entry.STEM] = entry
 
     # < ------------------------------------------------------------------- > #
 
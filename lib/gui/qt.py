@@ -1,30 +1,201 @@
+import threading
+
 from dataclasses import dataclass
 from pathlib import Path
 
 from photon import PHOTON_LOGGER
 from photon.lib.gui.common import FontVault
-from photon.lib.paths import Paths
-from PySide6.QtGui import QFontDatabase, QIcon, QPixmap
+from photon.lib.paths import sharedPaths
+from PySide6.QtCore import QByteArray
+from PySide6.QtGui import QFont, QFontDatabase, QIcon, QPixmap
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < style names in font file names and the qt weight they stand for > #
+FONT_WEIGHTS: dict[str, QFont.Weight] = {
+    "thin": QFont.Weight.Thin,
+    "extralight": QFont.Weight.ExtraLight,
+    "light": QFont.Weight.Light,
+    "regular": QFont.Weight.Normal,
+    "retina": QFont.Weight.Normal,
+    "medium": QFont.Weight.Medium,
+    "semibold": QFont.Weight.DemiBold,
+    "bold": QFont.Weight.Bold,
+    "extrabold": QFont.Weight.ExtraBold,
+    "black": QFont.Weight.Black,
+}
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def familyKey(family: str) -> str:
+    """
+    normalise a family name so "Fira Code" matches files named FiraCode-*
+    """
+
+    return family.replace(" ", "").replace("_", "").replace("-", "").lower()
 
 
 # < ----------------------------------------------------------------------- > #
 
 
 class QFontVault(FontVault):
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path, preload: bool = False) -> None:
         super().__init__(path)
 
-        if path.exists():
-            self.loadFromPath(path)
+        # < font file -> application font id, -1 if qt rejected it > #
+        self.registered: dict[Path, int] = {}
+        self._register_lock: threading.Lock = threading.Lock()
+        self._preloader: threading.Thread | None = None
 
-        self.reloadFontDatabase()
+        if preload:
+            self.preloadFontDatabase()
 
     # < ------------------------------------------------------------------- > #
 
     def reloadFontDatabase(self) -> None:
+        """
+        register every font with qt right now
+        """
+
         for font in self.fonts.values():
+            self.registerFile(font)
+
+    # < ------------------------------------------------------------------- > #
+
+    def registerFile(self, font: Path, data: bytes | None = None) -> int:
+        """
+        register a font file with qt once and get its application font id \n
+        data is the already read file, so it can be read away from the gui thread
+        """
+
+        with self._register_lock:
+            font_id: int | None = self.registered.get(font)
+
+            if font_id is not None:
+                return font_id
+
             PHOTON_LOGGER.debug(f"adding application font: {font.name}")
-            QFontDatabase.addApplicationFont(font.as_posix())
+
+            if data is None:
+                font_id = QFontDatabase.addApplicationFont(font.as_posix())
+            else:
+                font_id = QFontDatabase.addApplicationFontFromData(QByteArray(data))
+
+            if font_id < 0:
+                PHOTON_LOGGER.warning(f"qt could not load font: {font}")
+
+            self.registered[font] = font_id
+
+        return font_id
+
+    # < ------------------------------------------------------------------- > #
+
+    def familyFiles(
+        self, family: str, weight: QFont.Weight | None = None, italic: bool = False
+    ) -> list[Path]:
+        """
+        get the font files of a family, matched on their name table or else their
+        file names \n
+        with a weight just the files of that weight and slant are returned, plus
+        variable fonts and any whose style is unknown, falling back to the whole
+        family if nothing matches
+        """
+
+        key: str = familyKey(family)
+        files: list[Path] = []
+        matching: list[Path] = []
+
+        for stem, entry in self.entries.items():
+            parts: list[str] = stem.lower().split("-")
+            font_family: str = entry.FAMILY if entry.FAMILY is not None else parts[0]
+
+            if familyKey(font_family) != key:
+                continue
+
+            font: Path = Path(entry.PATH)
+            files.append(font)
+
+            if entry.STYLE is not None:
+                parts = [font_family, *entry.STYLE.lower().replace("-", " ").split()]
+
+            styles: list[str] = [part for part in parts[1:] if part != "italic"]
+
+            if entry.VARIABLE or any(style not in FONT_WEIGHTS for style in styles):
+                matching.append(font)
+                continue
+
+            file_weight: QFont.Weight = FONT_WEIGHTS[styles[0]] if styles else QFont.Weight.Normal
+
+            if file_weight == weight and ("italic" in parts[1:]) == italic:
+                matching.append(font)
+
+        if weight is None or matching.__len__() < 1:
+            return files
+
+        return matching
+
+    # < ------------------------------------------------------------------- > #
+
+    def getFont(
+        self,
+        family: str,
+        weight: QFont.Weight = QFont.Weight.Normal,
+        italic: bool = False,
+        point_size: int = -1,
+    ) -> QFont:
+        """
+        get a font, registering its files with qt the first time they are asked for \n
+        only the files for the weight and slant are registered, families and weights
+        that are never asked for are never parsed by qt
+        """
+
+        families: list[str] = []
+
+        for font in self.familyFiles(family, weight, italic):
+            font_id: int = self.registerFile(font)
+
+            if font_id >= 0:
+                families.extend(QFontDatabase.applicationFontFamilies(font_id))
+
+        if families.__len__() < 1:
+            PHOTON_LOGGER.debug(f"no bundled font for {family}, leaving it to qt")
+            families = [family]
+
+        return QFont(families[0], point_size, weight, italic)
+
+    # < ------------------------------------------------------------------- > #
+
+    def preloadFontDatabase(self) -> None:
+        """
+        read and register every font on a background thread \n
+        the files are read off the gui thread and fonts already registered by
+        getFont are skipped, getFont keeps working while this runs
+        """
+
+        if self._preloader is not None:
+            return None
+
+        fonts: list[Path] = list(self.fonts.values())
+
+        def preload() -> None:
+            for font in fonts:
+                if font in self.registered:
+                    continue
+
+                try:
+                    data: bytes = font.read_bytes()
+                except OSError as error:
+                    PHOTON_LOGGER.warning(f"could not read font {font}: {error}")
+                    continue
+
+                self.registerFile(font, data)
+
+        self._preloader = threading.Thread(target=preload, name="photon-font-preload", daemon=True)
+        self._preloader.start()
 
     # < ------------------------------------------------------------------- > #
 
@@ -47,7 +218,7 @@ class QImageVault:
     def __init__(self) -> None:
         self.images: dict[str, ImageData] = {}
 
-        for image in Paths("photon").images().iterdir():
+        for image in sharedPaths("photon").images().iterdir():
             PHOTON_LOGGER.debug(f"adding new image {image.stem}")
             self.images[image.stem] = ImageData(image, image.stem, None, None)
 
@@ -0,0 +1,466 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from photon import PHOTON_LOGGER
+from photon.lib.files import readToml
+from photon.lib.paths import sharedPaths, treeSize
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < default number of packages refreshed concurrently when listing > #
+INDEX_JOBS: int = 8
+
+# < hashes of every installed file and the validators of the archive they came from > #
+FILE_MANIFEST: str = ".photon-files"
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+@dataclass
+class IndexEntry:
+    # fmt:off
+    NAME            : str
+    ROOT            : str
+    VERSION         : str | None
+    MANIFEST_SHA256 : str | None
+    INSTALLED_AT    : float
+    ROOT_MTIME      : int
+    MANIFEST_MTIME  : int = 0
+    SIZE            : int = 0
+    RAW_NAME        : str | None = None
+    ETAG            : str | None = None
+    LAST_MODIFIED   : str | None = None
+    # fmt:on
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def indexFile() -> Path:
+    """
+    get the file the installed package index is stored in
+    """
+
+    return sharedPaths("photon").settings().joinpath("packages.json")
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def readManifestInfo(root: Path) -> tuple[str | None, str | None]:
+    """
+    get the version and sha256 of the manifest in a package root
+    """
+
+    import hashlib
+
+    manifest_file: Path = root.joinpath("manifest.toml")
+
+    try:
+        data: bytes = manifest_file.read_bytes()
+    except OSError:
+        return None, None
+
+    version: str | None = None
+
+    try:
+        raw: dict[str, Any] = readToml(manifest_file)
+        parts: dict[str, Any] = raw.get("version", {})
+        version = ".".join(str(parts[key]) for key in ["major", "minor", "revision"])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        PHOTON_LOGGER.debug(f"no valid version in {manifest_file}")
+
+    return version, hashlib.sha256(data).hexdigest()
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def readArchiveInfo(root: Path) -> tuple[str | None, str | None]:
+    """
+    get the etag and last modified date of the archive a package root was installed
+    from, as recorded in its file manifest
+    """
+
+    try:
+        raw: dict[str, Any] = json.loads(root.joinpath(FILE_MANIFEST).read_text())
+        etag = raw.get("etag")
+        last_modified = raw.get("last_modified")
+    except (OSError, ValueError, AttributeError):
+        return None, None
+
+    return (
+        etag if isinstance(etag, str) else None,
+        last_modified if isinstance(last_modified, str) else None,
+    )
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+class PackageIndex:
+    # < parsed once per process, reparsed only when the file changes on disk > #
+    _lock: threading.Lock = threading.Lock()
+    _cache: dict[Path, tuple[int, dict[str, IndexEntry]]] = {}
+
+    def __init__(self, path: Path | None = None) -> None:
+        self._path: Path = path if path is not None else indexFile()
+        self._entries: dict[str, IndexEntry] = {}
+
+        self.reloadIndex()
+
+    # < ------------------------------------------------------------------- > #
+
+    def reloadIndex(self) -> None:
+        """
+        reload the index from disk, reusing the parsed copy if the file is unchanged
+        """
+
+        try:
+            mtime: int = self._path.stat().st_mtime_ns
+        except OSError:
+            self._entries = {}
+            return None
+
+        cached = self._cache.get(self._path)
+
+        if cached is not None and cached[0] == mtime:
+            self._entries = dict(cached[1])
+            return None
+
+        self._entries = {}
+
+        try:
+            raw: dict[str, dict[str, Any]] = json.loads(self._path.read_text())
+        except (OSError, ValueError) as error:
+            PHOTON_LOGGER.warning(f"invalid package index, starting fresh:\n {error}")
+            return None
+
+        for name, value in raw.items():
+            try:
+                self._entries[name] = IndexEntry(**value)
+            except TypeError:
+                PHOTON_LOGGER.debug(f"dropping malformed index entry: {name}")
+
+        self._cache[self._path] = (mtime, dict(self._entries))
+
+    # < ------------------------------------------------------------------- > #
+
+    def writeIndex(self) -> None:
+        """
+        write the index to disk
+        """
+
+        raw = {name: asdict(entry) for name, entry in self._entries.items()}
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._path.parent, suffix=".json")
+
+        with os.fdopen(fd, "w") as fp:
+            json.dump(raw, fp, indent=4, sort_keys=True)
+
+        os.replace(tmp, self._path)
+
+        self._cache[self._path] = (self._path.stat().st_mtime_ns, dict(self._entries))
+
+    # < ------------------------------------------------------------------- > #
+
+    def entries(self) -> dict[str, IndexEntry]:
+        """
+        get every indexed package, keyed by name
+        """
+
+        return self._entries
+
+    # < ------------------------------------------------------------------- > #
+
+    def lookup(self, name: str) -> IndexEntry | None:
+        """
+        get the entry for an installed package with a single stat of its root \n
+        entries whose root is gone are dropped, changed roots are refreshed
+        """
+
+        entry: IndexEntry | None = self._entries.get(name)
+
+        if entry is None:
+            return None
+
+        try:
+            mtime: int = os.stat(entry.ROOT).st_mtime_ns
+        except OSError:
+            PHOTON_LOGGER.debug(f"indexed root for {name} is gone, dropping it")
+            self.remove(name)
+            return None
+
+        # < changed outside of photon, pick up the new manifest > #
+        if mtime != entry.ROOT_MTIME:
+            return self.record(name, Path(entry.ROOT), entry.INSTALLED_AT, entry.RAW_NAME)
+
+        return entry
+
+    # < ------------------------------------------------------------------- > #
+
+    def record(
+        self,
+        name: str,
+        root: Path,
+        installed_at: float | None = None,
+        raw_name: str | None = None,
+    ) -> IndexEntry:
+        """
+        add or refresh the entry for a package installed at root \n
+        raw_name is the name it was installed with, kept so it can be checked for updates
+        """
+
+        entry: IndexEntry = self.scan(name, root, installed_at, raw_name)
+
+        with self._lock:
+            self.reloadIndex()
+            self._entries[name] = entry
+            self.writeIndex()
+
+        PHOTON_LOGGER.debug(f"indexed {name} at {root}")
+
+        return entry
+
+    # < ------------------------------------------------------------------- > #
+
+    def scan(
+        self,
+        name: str,
+        root: Path,
+        installed_at: float | None = None,
+        raw_name: str | None = None,
+    ) -> IndexEntry:
+        """
+        build an entry from what is on disk at root, without touching the index
+        """
+
+        version, manifest_sha256 = readManifestInfo(root)
+        etag, last_modified = readArchiveInfo(root)
+
+        try:
+            manifest_mtime: int = root.joinpath("manifest.toml").stat().st_mtime_ns
+        except OSError:
+            manifest_mtime = 0
+
+        return IndexEntry(
+            name,
+            str(root),
+            version,
+            manifest_sha256,
+            installed_at if installed_at is not None else time.time(),
+            root.stat().st_mtime_ns,
+            manifest_mtime,
+            treeSize(root),
+            raw_name,
+            etag,
+            last_modified,
+        )
+
+    # < ------------------------------------------------------------------- > #
+
+    def refresh(self, jobs: int = INDEX_JOBS) -> dict[str, IndexEntry]:
+        """
+        check every entry against the disk concurrently and rescan the changed ones \n
+        an entry is only rescanned if the mtime of its root or manifest moved,
+        entries whose root is gone are dropped
+        """
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        def check(entry: IndexEntry) -> IndexEntry | None:
+            root = Path(entry.ROOT)
+
+            try:
+                root_mtime: int = root.stat().st_mtime_ns
+            except OSError:
+                return None
+
+            try:
+                manifest_mtime: int = root.joinpath("manifest.toml").stat().st_mtime_ns
+            except OSError:
+                manifest_mtime = 0
+
+            if root_mtime == entry.ROOT_MTIME and manifest_mtime == entry.MANIFEST_MTIME:
+                return entry
+
+            PHOTON_LOGGER.debug(f"{entry.NAME} changed on disk, rescanning")
+            return self.scan(entry.NAME, root, entry.INSTALLED_AT, entry.RAW_NAME)
+
+        entries: list[IndexEntry] = list(self._entries.values())
+
+        if entries.__len__() < 1:
+            return self._entries
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            checked: list[IndexEntry | None] = list(executor.map(check, entries))
+
+        changed: dict[str, IndexEntry | None] = {
+            old.NAME: new for old, new in zip(entries, checked) if new is not old
+        }
+
+        if changed.__len__() < 1:
+            return self._entries
+
+        with self._lock:
+            self.reloadIndex()
+
+            for name, entry in changed.items():
+                if entry is None:
+                    self._entries.pop(name, None)
+                else:
+                    self._entries[name] = entry
+
+            self.writeIndex()
+
+        return self._entries
+
+    # < ------------------------------------------------------------------- > #
+
+    def discover(self, install_root: Path) -> list[str]:
+        """
+        index packages under install_root that have no entry yet, such as ones
+        installed before the index existed \n
+        a directory counts as a package if it has a manifest.toml or file manifest
+        and can be imported or run, returns the names that were added
+        """
+
+        found: dict[str, IndexEntry] = {}
+
+        try:
+            with os.scandir(install_root) as iterator:
+                candidates: list[os.DirEntry[str]] = [
+                    item
+                    for item in iterator
+                    if item.name.isidentifier() and item.name not in self._entries and item.is_dir()
+                ]
+        except OSError as error:
+            PHOTON_LOGGER.debug(f"could not scan {install_root}: {error}")
+            return []
+
+        for item in candidates:
+            root = Path(item.path)
+
+            # < photon lives in the same directory but is not a package it installed > #
+            if root == sharedPaths("photon").root():
+                continue
+
+            if not any(root.joinpath(file).exists() for file in ["manifest.toml", FILE_MANIFEST]):
+                continue
+
+            if not any(root.joinpath(file).exists() for file in ["__init__.py", "__main__.py"]):
+                continue
+
+            PHOTON_LOGGER.debug(f"found unindexed package: {item.name}")
+            found[item.name] = self.scan(item.name, root, root.stat().st_mtime)
+
+        if found.__len__() < 1:
+            return []
+
+        with self._lock:
+            self.reloadIndex()
+
+            for name, entry in found.items():
+                self._entries.setdefault(name, entry)
+
+            self.writeIndex()
+
+        return list(found)
+
+    # < ------------------------------------------------------------------- > #
+
+    def remove(self, name: str) -> None:
+        """
+        drop a package from the index
+        """
+
+        with self._lock:
+            self.reloadIndex()
+
+            if self._entries.pop(name, None) is not None:
+                self.writeIndex()
+
+    # < ------------------------------------------------------------------- > #
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def formatSize(size: int) -> str:
+    """
+    format a size in bytes for humans
+    """
+
+    value: float = size
+
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if value < 1024 or unit == "GiB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+
+        value = value / 1024
+
+    return f"{size} B"
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def installRoot() -> Path:
+    """
+    get the directory packages are installed in, next to photon itself
+    """
+
+    return sharedPaths("photon").root().parent
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def listPackages(jobs: int = INDEX_JOBS) -> int:
+    """
+    print every installed package with its version, size on disk and last update \n
+    packages missing from the index are found and indexed first
+    """
+
+    index = PackageIndex()
+    index.discover(installRoot())
+
+    entries: dict[str, IndexEntry] = index.refresh(jobs)
+
+    if entries.__len__() < 1:
+        PHOTON_LOGGER.info("no packages installed")
+        return 0
+
+    rows: list[list[str]] = [["name", "version", "size", "updated"]]
+
+    for name in sorted(entries):
+        entry: IndexEntry = entries[name]
+        rows.append(
+            [
+                name,
+                entry.VERSION if entry.VERSION is not None else "-",
+                formatSize(entry.SIZE),
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.INSTALLED_AT)),
+            ]
+        )
+
+    widths: list[int] = [max(row[column].__len__() for row in rows) for column in range(4)]
+
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+    return 0
+
+
+# < ----------------------------------------------------------------------- > #
@@ -1,7 +1,15 @@
-import inspect
+import atexit
+import functools
 import logging
+import sys
 
 from pathlib import Path
+from types import FrameType
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from logging.handlers import QueueHandler, QueueListener
 
 
 # < ----------------------------------------------------------------------- > #
@@ -25,6 +33,18 @@ def pathToParents(path: Path, parents: int = 1) -> Path:
 # < ----------------------------------------------------------------------- > #
 
 
+@functools.cache
+def shortPath(filename: str) -> Path:
+    """
+    cached pathToParents for source files, called on every log record
+    """
+
+    return pathToParents(Path(filename))
+
+
+# < ----------------------------------------------------------------------- > #
+
+
 class ColourFormatter(logging.Formatter):
     # fmt: off
     GREY    : str = "\x1b[90;1m"
@@ -45,31 +65,99 @@ class ColourFormatter(logging.Formatter):
     date_format: str = "%H:%M:%S"
 
     # fmt: off
-    FORMATS: dict[int, str] = {
-        logging.DEBUG    : CYAN   + message_format + RESET,
-        logging.INFO     : GREEN  + message_format + RESET,
-        logging.WARNING  : YELLOW + message_format + RESET,
-        logging.ERROR    : RED    + message_format + RESET,
-        logging.CRITICAL : RED    + message_format + RESET,
+    COLOURS: dict[int, str] = {
+        logging.DEBUG    : CYAN,
+        logging.INFO     : GREEN,
+        logging.WARNING  : YELLOW,
+        logging.ERROR    : RED,
+        logging.CRITICAL : RED,
     }
     # fmt: on
 
     # < ------------------------------------------------------------------- > #
 
-    def format(self, record: logging.LogRecord) -> str:
+    def __init__(self, colour: bool = True) -> None:
+        super().__init__()
+
+        self.colour: bool = colour
+        self.formatters: dict[int, logging.Formatter] = {}
+        self.fallback: logging.Formatter
+
+        self.buildFormatters()
+
+    # < ------------------------------------------------------------------- > #
+
+    def buildFormatters(self) -> None:
+        """
+        build one formatter per level, only needed when the formats change
+        """
+
         defaults: dict[str, str] = {"file": "file", "line": "line", "func": "func"}
-        fmt: str = self.FORMATS.get(record.levelno, self.message_format)
-        return logging.Formatter(fmt, self.date_format, defaults=defaults).format(record)
+
+        for level, colour in self.COLOURS.items():
+            fmt: str = self.message_format
+
+            if self.colour:
+                fmt = colour + fmt + self.RESET
+
+            self.formatters[level] = logging.Formatter(fmt, self.date_format, defaults=defaults)
+
+        self.fallback = logging.Formatter(self.message_format, self.date_format, defaults=defaults)
+
+    # < ------------------------------------------------------------------- > #
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self.formatters.get(record.levelno, self.fallback).format(record)
+
+    # < ------------------------------------------------------------------- > #
+
+    def setColour(self, colour: bool) -> None:
+        self.colour = colour
+        self.buildFormatters()
 
     # < ------------------------------------------------------------------- > #
 
     def setMessageFormat(self, message_format: str) -> None:
         self.message_format = message_format
+        self.buildFormatters()
 
     # < ------------------------------------------------------------------- > #
 
     def setDateFormat(self, date_format: str) -> None:
         self.date_format = date_format
+        self.buildFormatters()
+
+    # < ------------------------------------------------------------------- > #
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+class JsonFormatter(logging.Formatter):
+    date_format: str = "%Y-%m-%dT%H:%M:%S%z"
+
+    # < ------------------------------------------------------------------- > #
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        format a record as a single line of json
+        """
+
+        import json
+
+        entry: dict[str, object] = {
+            "time": self.formatTime(record, self.date_format),
+            "level": record.levelname,
+            "file": str(getattr(record, "file", record.pathname)),
+            "line": getattr(record, "line", record.lineno),
+            "func": getattr(record, "func", record.funcName),
+            "message": record.getMessage(),
+        }
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
 
     # < ------------------------------------------------------------------- > #
 
@@ -78,7 +166,7 @@ class ColourFormatter(logging.Formatter):
 
 
 class Logger:
-    def __init__(self, level: int = 0, name: str | None = None) -> None:
+    def __init__(self, level: int = 0, name: str | None = None, colour: bool | None = None) -> None:
         self.root: logging.Logger
         if name is None:
             self.root = logging.getLogger()
@@ -89,7 +177,17 @@ class Logger:
 
         self.stream_handler: logging.StreamHandler[logging.TextIO] = logging.StreamHandler()
 
-        self.stream_handler.setFormatter(ColourFormatter())
+        # < colour only when writing to a terminal unless told otherwise > #
+        if colour is None:
+            colour = self.stream_handler.stream.isatty()
+
+        self.stream_handler.setFormatter(ColourFormatter(colour))
+
+        self.queue_handler: QueueHandler | None = None
+        self.queue_listener: QueueListener | None = None
+
+        # < the name of the current format, see setFormat > #
+        self.log_format: str = "text"
 
         if not self.root.hasHandlers():
             self.root.addHandler(self.stream_handler)
@@ -101,58 +199,136 @@ class Logger:
 
     # < ------------------------------------------------------------------- > #
 
-    def debug(self, msg: object) -> None:
-        stack: inspect.FrameInfo = inspect.stack()[1]
+    def setFormat(self, log_format: str) -> bool:
+        """
+        set the output format, either text or json \n
+        returns False for an unknown format
+        """
+
+        match log_format.lower():
+            case "text":
+                colour: bool = self.stream_handler.stream.isatty()
+                self.stream_handler.setFormatter(ColourFormatter(colour))
 
-        func: str = stack.function
-        file: Path = pathToParents(Path(stack.filename))
-        line: int = stack.lineno
+            case "json":
+                self.stream_handler.setFormatter(JsonFormatter())
 
-        self.root.debug(msg, extra={"func": func, "file": file, "line": line})
+            case _:
+                return False
+
+        self.log_format = log_format.lower()
+
+        return True
 
     # < ------------------------------------------------------------------- > #
 
-    def info(self, msg: object) -> None:
-        stack: inspect.FrameInfo = inspect.stack()[1]
+    def startQueue(self) -> None:
+        """
+        hand records to a background thread so logging never blocks on the stream
+        """
+
+        import queue
+
+        from logging.handlers import QueueHandler, QueueListener
 
-        func: str = stack.function
-        file: Path = pathToParents(Path(stack.filename))
-        line: int = stack.lineno
+        # < nothing to do if already queued or photon is not the one writing > #
+        if self.queue_listener is not None or self.stream_handler not in self.root.handlers:
+            return None
 
-        self.root.info(msg, extra={"func": func, "file": file, "line": line})
+        records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+
+        self.queue_handler = QueueHandler(records)
+        self.queue_listener = QueueListener(records, self.stream_handler)
+
+        self.root.removeHandler(self.stream_handler)
+        self.root.addHandler(self.queue_handler)
+
+        self.queue_listener.start()
+        atexit.register(self.stopQueue)
 
     # < ------------------------------------------------------------------- > #
 
-    def warning(self, msg: object) -> None:
-        stack: inspect.FrameInfo = inspect.stack()[1]
+    def stopQueue(self) -> None:
+        """
+        flush any queued records and write directly to the stream again
+        """
+
+        if self.queue_listener is None or self.queue_handler is None:
+            return None
 
-        func: str = stack.function
-        file: Path = pathToParents(Path(stack.filename))
-        line: int = stack.lineno
+        self.queue_listener.stop()
 
-        self.root.warning(msg, extra={"func": func, "file": file, "line": line})
+        self.root.removeHandler(self.queue_handler)
+        self.root.addHandler(self.stream_handler)
+
+        self.queue_handler = None
+        self.queue_listener = None
 
     # < ------------------------------------------------------------------- > #
 
-    def error(self, msg: object) -> None:
-        stack: inspect.FrameInfo = inspect.stack()[1]
+    def resetAfterFork(self) -> None:
+        """
+        write directly to the stream again in a forked child \n
+        the queue thread does not survive a fork, so it cannot be stopped as usual,
+        anything still queued belongs to the parent
+        """
 
-        func: str = stack.function
-        file: Path = pathToParents(Path(stack.filename))
-        line: int = stack.lineno
+        if self.queue_handler is not None:
+            self.root.removeHandler(self.queue_handler)
+            self.root.addHandler(self.stream_handler)
 
-        self.root.error(msg, extra={"func": func, "file": file, "line": line})
+        self.queue_handler = None
+        self.queue_listener = None
 
     # < ------------------------------------------------------------------- > #
 
-    def critical(self, msg: object) -> None:
-        stack: inspect.FrameInfo = inspect.stack()[1]
+    def log(self, level: int, msg: object, stacklevel: int = 1) -> None:
+        """
+        log with the callers file, line and function \n
+        as with logging, stacklevel 1 is whoever called log and each level above it
+        skips one more frame, so wrappers pass 2
+        """
+
+        if not self.root.isEnabledFor(level):
+            return None
 
-        func: str = stack.function
-        file: Path = pathToParents(Path(stack.filename))
-        line: int = stack.lineno
+        frame: FrameType = sys._getframe(stacklevel)
 
-        self.root.critical(msg, extra={"func": func, "file": file, "line": line})
+        func: str = frame.f_code.co_name
+        file: Path = shortPath(frame.f_code.co_filename)
+        line: int = frame.f_lineno
+
+        self.root.log(
+            level,
+            msg,
+            extra={"func": func, "file": file, "line": line},
+            stacklevel=stacklevel + 1,
+        )
+
+    # < ------------------------------------------------------------------- > #
+
+    def debug(self, msg: object) -> None:
+        self.log(logging.DEBUG, msg, stacklevel=2)
+
+    # < ------------------------------------------------------------------- > #
+
+    def info(self, msg: object) -> None:
+        self.log(logging.INFO, msg, stacklevel=2)
+
+    # < ------------------------------------------------------------------- > #
+
+    def warning(self, msg: object) -> None:
+        self.log(logging.WARNING, msg, stacklevel=2)
+
+    # < ------------------------------------------------------------------- > #
+
+    def error(self, msg: object) -> None:
+        self.log(logging.ERROR, msg, stacklevel=2)
+
+    # < ------------------------------------------------------------------- > #
+
+    def critical(self, msg: object) -> None:
+        self.log(logging.CRITICAL, msg, stacklevel=2)
 
     # < ------------------------------------------------------------------- > #
 
@@ -1,42 +1,326 @@
-import subprocess
+from __future__ import annotations
+
 import sys
-import time
+import threading
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
 
 from photon import PHOTON_LOGGER
 
 
-if sys.platform == "win32":
-    import win11toast
+if TYPE_CHECKING:
+    from jeepney.io.blocking import DBusConnection
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < title used when a notification is sent without one, also the dbus app name > #
+NOTIFY_TITLE: str = "photon"
+
+# < (message, title, delay) -> delivered, backends are tried in order until one delivers > #
+NotifyBackend = Callable[[str, str, float], bool]
+
+# < set through configure, notifications are on and immediate by default > #
+_enabled: bool = True
+_delay: float = 0
+
+# < messages held back by coalesced, None when not collecting > #
+_collected: list[str] | None = None
+
+# < set through setBackends, None means the platform defaults > #
+_backends: list[NotifyBackend] | None = None
+
+# < session bus connection, opened on first use and kept for the process > #
+_dbus_connection: DBusConnection | None = None
+_dbus_lock: threading.Lock = threading.Lock()
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def _notify_dbus(message: str, title: str = "", delay: float = 0) -> bool:
+    """
+    send a notification to org.freedesktop.Notifications over the session bus \n
+    the call is sent flagged as not expecting a reply and never waited on, so only
+    failing to reach the bus or there being no notification server on it, checked
+    once per connection, counts as undelivered \n
+    the connection is reused for every notification, delayed ones are left to
+    notify-send as waiting here would block the caller
+    """
+
+    global _dbus_connection
+
+    if delay > 0:
+        return False
+
+    try:
+        from jeepney import DBusAddress, MessageFlag, new_method_call
+        from jeepney.io.blocking import open_dbus_connection
+    except ImportError:
+        PHOTON_LOGGER.debug("jeepney not installed, skipping dbus")
+        return False
+
+    address = DBusAddress(
+        "/org/freedesktop/Notifications",
+        bus_name="org.freedesktop.Notifications",
+        interface="org.freedesktop.Notifications",
+    )
+
+    # < app name, replaces id, icon, summary, body, actions, hints, timeout > #
+    message_call = new_method_call(
+        address,
+        "Notify",
+        "susssasa{sv}i",
+        (NOTIFY_TITLE, 0, "", title, message, [], {}, -1),
+    )
+
+    # < the server sends nothing back, so unread replies never pile up on the socket > #
+    message_call.header.flags |= MessageFlag.no_reply_expected
+
+    # < one writer at a time on the shared connection > #
+    with _dbus_lock:
+        try:
+            if _dbus_connection is None:
+                connection = open_dbus_connection(bus="SESSION")
+
+                # < the bus drops calls to a name nobody owns without a word, so > #
+                # < check once per connection that there is a server to deliver to > #
+                if not _hasNotificationServer(connection):
+                    PHOTON_LOGGER.debug("no notification server on the session bus")
+                    connection.close()
+                    return False
+
+                _dbus_connection = connection
+
+            _dbus_connection.send(message_call)
+        except (OSError, KeyError, ValueError) as error:
+            # < KeyError is raised by jeepney when there is no session bus address > #
+            PHOTON_LOGGER.debug(f"failed to reach the session bus: {error}")
+            _dbus_connection = None
+            return False
+
+    return True
 
 
 # < ----------------------------------------------------------------------- > #
 
 
-def _notify_linux(message: str, title: str = "") -> None:
-    subprocess.run(["notify-send", title, message])
+def _hasNotificationServer(connection: DBusConnection) -> bool:
+    """
+    check that org.freedesktop.Notifications is running or can be started by the bus
+    """
+
+    from jeepney.bus_messages import message_bus
+    from jeepney.wrappers import DBusErrorResponse, unwrap_msg
+
+    name: str = "org.freedesktop.Notifications"
+
+    try:
+        if unwrap_msg(connection.send_and_get_reply(message_bus.NameHasOwner(name), timeout=1))[0]:
+            return True
+
+        # < a server the bus starts on demand has no owner until it is first called > #
+        activatable = unwrap_msg(
+            connection.send_and_get_reply(message_bus.ListActivatableNames(), timeout=1)
+        )
+    except (OSError, DBusErrorResponse) as error:
+        PHOTON_LOGGER.debug(f"failed to ask the session bus for {name}: {error}")
+        return False
+
+    return name in activatable[0]
 
 
 # < ----------------------------------------------------------------------- > #
 
 
-def _notify_win32(message: str, title: str = "") -> None:
-    win11toast.toast(title, message)
+def closeDbus() -> None:
+    """
+    close the session bus connection, the next notification opens a new one
+    """
+
+    global _dbus_connection
+
+    if _dbus_connection is None:
+        return None
+
+    try:
+        _dbus_connection.close()
+    except OSError:
+        pass
+
+    _dbus_connection = None
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def _notify_linux(message: str, title: str = "", delay: float = 0) -> bool:
+    import subprocess
+
+    command: list[str] = ["notify-send", title, message]
+
+    # < the shell waits instead of us, positional args keep the message unquoted > #
+    if delay > 0:
+        command = ["sh", "-c", f'sleep {delay} ; exec notify-send "$0" "$1"', title, message]
+
+    try:
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError as error:
+        PHOTON_LOGGER.debug(f"failed to start notify-send: {error}")
+        return False
+
+    return True
 
 
 # < ----------------------------------------------------------------------- > #
 
 
-def notify(message: str, title: str = "", sleep: int = 3) -> None:
-    time.sleep(sleep)
+def _notify_win32(message: str, title: str = "", delay: float = 0) -> bool:
+    import subprocess
+
+    # < toast blocks until dismissed, so it is shown from a detached interpreter > #
+    code: str = (
+        "import sys, time, win11toast; "
+        "time.sleep(float(sys.argv[3])); "
+        "win11toast.toast(sys.argv[1], sys.argv[2])"
+    )
+
+    try:
+        subprocess.Popen(
+            [sys.executable, "-c", code, title, message, str(delay)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=subprocess.DETACHED_PROCESS,
+        )
+    except OSError as error:
+        PHOTON_LOGGER.debug(f"failed to start toast: {error}")
+        return False
+
+    return True
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def defaultBackends() -> list[NotifyBackend]:
+    """
+    get the backends for this platform, best first
+    """
+
     match sys.platform:
         case "linux":
-            _notify_linux(title, message)
+            return [_notify_dbus, _notify_linux]
 
         case "win32":
-            _notify_win32(title, message)
+            return [_notify_win32]
 
         case _:
-            PHOTON_LOGGER.warning("unsupported notify platform")
+            return []
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def setBackends(backends: list[NotifyBackend] | None) -> None:
+    """
+    replace the backends notify tries, None restores the platform defaults
+    """
+
+    global _backends
+
+    _backends = backends
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def configure(enabled: bool = True, delay: float = 0) -> None:
+    """
+    turn notifications on or off and set how many seconds they are delayed by
+    """
+
+    global _enabled, _delay
+
+    _enabled = enabled
+    _delay = max(0, delay)
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def notify(
+    message: str,
+    title: str = "",
+    delay: float | None = None,
+    backends: list[NotifyBackend] | None = None,
+) -> None:
+    """
+    show a desktop notification without waiting for it to be dismissed \n
+    each backend is tried in turn, see defaultBackends, if none delivers the
+    message is logged instead \n
+    delay defaults to the one set with configure, backends to setBackends
+    """
+
+    if not _enabled:
+        return None
+
+    if _collected is not None:
+        _collected.append(message)
+        return None
+
+    if title == "":
+        title = NOTIFY_TITLE
+
+    if delay is None:
+        delay = _delay
+
+    if backends is None:
+        backends = _backends if _backends is not None else defaultBackends()
+
+    for backend in backends:
+        if backend(message, title, delay):
+            return None
+
+    PHOTON_LOGGER.info(f"{title}: {message}")
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+@contextmanager
+def coalesced(title: str = "") -> Iterator[None]:
+    """
+    hold back every notification sent inside the block and send them as one at the end
+    """
+
+    global _collected
+
+    if _collected is not None:
+        yield None
+        return None
+
+    messages: list[str] = []
+    _collected = messages
+
+    try:
+        yield None
+    finally:
+        _collected = None
+
+    if messages.__len__() == 1:
+        notify(messages[0], title)
+    elif messages.__len__() > 1:
+        notify("\n".join(messages), title)
 
 
 # < ----------------------------------------------------------------------- > #
@@ -1,21 +1,72 @@
+from __future__ import annotations
+
+import copy
 import importlib.util
-import json
-import os
 import shutil
-import subprocess
 import sys
+import threading
 
 from dataclasses import dataclass
-from io import BytesIO
 from pathlib import Path
-from typing import Any
-from zipfile import ZipFile
-
-import requests
-import toml
+from typing import IO, TYPE_CHECKING, Any
 
 from photon import PHOTON_LOGGER
-from photon.lib.paths import Paths, rmEmpty
+
+
+# < update.py is this file run by the photon it replaces, see PhotonPackage.update > #
+# < a photon older than these modules lacks them, so they are taken from the archive > #
+# < being installed, the one whose lib/package.py update.py was copied from > #
+try:
+    import photon.lib.index
+except ImportError:
+    import photon.lib
+
+    for _archive in Path(__file__).parent.joinpath("pkg").glob("*/lib/package.py"):
+        if Path(__file__).read_bytes().startswith(_archive.read_bytes()):
+            PHOTON_LOGGER.debug(f"loading missing modules from {_archive.parent}")
+            photon.lib.__path__ = [str(_archive.parent), *photon.lib.__path__]
+            sys.modules.pop("photon.lib.paths", None)
+
+            # < installing moves the archive's files, load what the update needs first > #
+            importlib.import_module("photon.lib.cache")
+            importlib.import_module("photon.lib.dependencies")
+            break
+
+from photon.lib.files import WRITE_DELAY, DebouncedWriter, fileStamp, readToml, writeAtomic
+from photon.lib.index import FILE_MANIFEST, IndexEntry, PackageIndex, readArchiveInfo
+from photon.lib.paths import (
+    Paths,
+    exchangePaths,
+    hashTree,
+    linkOrCopy,
+    rmEmpty,
+    sharedPaths,
+)
+
+
+# < heavy modules are imported where they are used so that run, help and version > #
+# < do not pay for networking, the toml writer or zipfile at startup > #
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from zipfile import ZipFile, ZipInfo
+
+    import requests
+
+    from photon.lib.batch import Probe
+    from photon.lib.cache import CacheEntry
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < size of each chunk read from the network while downloading > #
+DOWNLOAD_CHUNK_SIZE: int = 1024 * 64
+
+# < archives larger than this are spooled to a file under pkg/ instead of ram > #
+DOWNLOAD_MEMORY_LIMIT: int = 1024 * 1024 * 8
+
+# < seconds between checks when watching config files for changes > #
+WATCH_INTERVAL: float = 1.0
 
 
 # < ----------------------------------------------------------------------- > #
@@ -45,100 +96,239 @@ class PackageConfig:
 
         self._paths: Paths = self._package.PATHS
 
-        self._config: dict[str, str] = {}
-        self._stylesheet: str = ""
+        # < read on first access so modes that never use them do no io > #
+        self._config: dict[str, Any] | None = None
+        self._stylesheet: str | None = None
 
-        if self._paths.config().exists():
-            self._config = toml.load(self._paths.config())
+        # < (mtime_ns, size) of each file when it was last read or written > #
+        self._stamps: dict[str, tuple[int, int] | None] = {}
 
-        if self._paths.stylesheet().exists():
-            self._stylesheet = self._paths.stylesheet().read_text()
+        self._callbacks: list[Callable[[str], None]] = []
+        self._watcher: threading.Thread | None = None
+        self._stop_watching: threading.Event = threading.Event()
+
+        # < set by setAutosave, writes changes shortly after they are set > #
+        self._writer: DebouncedWriter | None = None
 
     # < ------------------------------------------------------------------- > #
 
-    def getConfig(self) -> dict[str, str]:
+    def getConfig(self) -> dict[str, Any]:
         """
-        get the current config
+        get the current config, read from disk on first access
         """
 
-        return self._config
+        if self._config is None:
+            self.reloadConfig()
+
+        return self._config if self._config is not None else {}
 
     # < ------------------------------------------------------------------- > #
 
-    def setConfig(self, config: dict[str, str]) -> None:
+    def setConfig(self, config: dict[str, Any]) -> None:
         """
-        set the current config
+        set the current config, with autosave on it is written shortly after
         """
 
         self._config = config
 
+        if self._writer is not None:
+            # < written from a snapshot, the dict may change while the writer serialises it > #
+            snapshot: dict[str, Any] = copy.deepcopy(config)
+            self._writer.schedule("config", lambda: self.writeConfig(snapshot))
+
     # < ------------------------------------------------------------------- > #
 
     def reloadConfig(self) -> None:
         """
-        reload the config from the current path
+        reload the config from the current path \n
+        the current config is kept if the file is missing
         """
 
-        new: dict[str, Any] | None = None
-
-        if self._paths.config().exists():
-            new = toml.load(self._paths.config())
+        path: Path = self._paths.config()
+        self._stamps["config"] = fileStamp(path)
 
-        if new is dict[str, str]:
-            self.setConfig(new)
+        if path.exists():
+            self._config = readToml(path)
+        elif self._config is None:
+            self._config = {}
 
     # < ------------------------------------------------------------------- > #
 
-    def writeConfig(self) -> None:
+    def writeConfig(self, config: dict[str, Any] | None = None) -> bool:
         """
-        write the current config to the current path
+        write config, or the current config if not given, to the current path,
+        atomically \n
+        returns False if the file already held the same config
         """
 
-        with open(self._paths.config(), "w") as fp:
-            toml.dump(self.getConfig(), fp)
+        import toml
+
+        data: dict[str, Any] = config if config is not None else self.getConfig()
+        written: bool = writeAtomic(self._paths.config(), toml.dumps(data))
+        self._stamps["config"] = fileStamp(self._paths.config())
+
+        return written
 
     # < ------------------------------------------------------------------- > #
 
     def getStylesheet(self) -> str:
         """
-        get the current stylesheet
+        get the current stylesheet, read from disk on first access
         """
 
-        return self._stylesheet
+        if self._stylesheet is None:
+            self.reloadStylesheet()
+
+        return self._stylesheet if self._stylesheet is not None else ""
 
     # < ------------------------------------------------------------------- > #
 
     def setStylesheet(self, stylesheet: str) -> None:
         """
-        set the current stylesheet
+        set the current stylesheet, with autosave on it is written shortly after
         """
 
         self._stylesheet = stylesheet
 
+        if self._writer is not None:
+            self._writer.schedule("stylesheet", lambda: self.writeStylesheet(stylesheet))
+
     # < ------------------------------------------------------------------- > #
 
     def reloadStylesheet(self) -> None:
         """
-        reload the stylesheet from the current path
+        reload the stylesheet from the current path \n
+        the current stylesheet is kept if the file is missing
         """
 
-        new: str | None = None
+        path: Path = self._paths.stylesheet()
+        self._stamps["stylesheet"] = fileStamp(path)
 
-        if self._paths.stylesheet().exists():
-            new = self._paths.stylesheet().read_text()
+        if path.exists():
+            self._stylesheet = path.read_text()
+        elif self._stylesheet is None:
+            self._stylesheet = ""
 
-        if new is str:
-            self.setStylesheet(new)
+    # < ------------------------------------------------------------------- > #
+
+    def writeStylesheet(self, stylesheet: str | None = None) -> bool:
+        """
+        write stylesheet, or the current stylesheet if not given, to the current path,
+        atomically \n
+        returns False if the file already held the same stylesheet
+        """
+
+        data: str = stylesheet if stylesheet is not None else self.getStylesheet()
+        written: bool = writeAtomic(self._paths.stylesheet(), data)
+        self._stamps["stylesheet"] = fileStamp(self._paths.stylesheet())
+
+        return written
+
+    # < ------------------------------------------------------------------- > #
+
+    def setAutosave(self, delay: float | None = WRITE_DELAY) -> None:
+        """
+        write config and stylesheet on a background thread whenever they are set \n
+        changes made within delay seconds of each other are written together,
+        None turns autosave off after writing anything pending
+        """
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        if delay is not None:
+            self._writer = DebouncedWriter(delay)
 
     # < ------------------------------------------------------------------- > #
 
-    def writeStylesheet(self) -> None:
+    def flush(self) -> None:
         """
-        write the current stylesheet to the current path
+        write any autosave changes that are still pending
         """
 
-        with open(self._paths.stylesheet(), "w") as fp:
-            fp.write(self.getStylesheet())
+        if self._writer is not None:
+            self._writer.flush()
+
+    # < ------------------------------------------------------------------- > #
+
+    def checkForChanges(self) -> list[str]:
+        """
+        reload whichever of config and stylesheet changed on disk since last read \n
+        returns what was reloaded, callbacks from watch are called for each \n
+        files that were never read are skipped, they are read fresh on first access
+        """
+
+        changed: list[str] = []
+
+        for name, path, reload in [
+            ("config", self._paths.config(), self.reloadConfig),
+            ("stylesheet", self._paths.stylesheet(), self.reloadStylesheet),
+        ]:
+            if name not in self._stamps or self._stamps[name] == fileStamp(path):
+                continue
+
+            PHOTON_LOGGER.debug(f"{name} changed on disk, reloading")
+            reload()
+            changed.append(name)
+
+        for name in changed:
+            for callback in self._callbacks:
+                callback(name)
+
+        return changed
+
+    # < ------------------------------------------------------------------- > #
+
+    def watch(self, callback: Callable[[str], None], interval: float = WATCH_INTERVAL) -> None:
+        """
+        reload config and stylesheet when they change on disk and call callback
+        with "config" or "stylesheet" afterwards \n
+        files are checked every interval seconds from a daemon thread, callbacks run
+        on that thread so gui code should hand the update to its own thread
+        """
+
+        import traceback
+
+        self._callbacks.append(callback)
+
+        if self._watcher is not None:
+            return None
+
+        # < read both now so there is something to compare against > #
+        self.getConfig()
+        self.getStylesheet()
+
+        def loop() -> None:
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.checkForChanges()
+                # < callbacks are the caller's code and may raise anything, logging it > #
+                # < with its traceback keeps one bad callback from ending the watcher > #
+                except Exception:  # noqa: BLE001
+                    PHOTON_LOGGER.warning(
+                        f"failed to reload changed config:\n {traceback.format_exc()}"
+                    )
+
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=loop, name="photon-config-watcher", daemon=True)
+        self._watcher.start()
+
+    # < ------------------------------------------------------------------- > #
+
+    def unwatch(self) -> None:
+        """
+        stop watching for changes and drop every callback
+        """
+
+        self._callbacks = []
+
+        if self._watcher is None:
+            return None
+
+        self._stop_watching.set()
+        self._watcher.join()
+        self._watcher = None
 
     # < ------------------------------------------------------------------- > #
 
@@ -173,14 +363,33 @@ class Package:
 
         self._name = _names_split[1]
         self._dir_name = self._name.replace(" ", "_").replace("-", "_").lower()
-        self._paths = Paths(self._dir_name)
 
         self._installed: bool = False
-        self._manifest: bool = False
-        self._manifest_file: Path = self._paths.root().joinpath("manifest.toml")
+        self._up_to_date: bool = False
+        self._session: requests.Session | None = None
+
+        # < etag and last modified date of the last fetched archive, see fetch > #
+        self._validators: tuple[str | None, str | None] = (None, None)
 
-        if importlib.util.find_spec(self._dir_name) is not None:
+        # < the index answers without searching sys.path, find_spec is the fallback > #
+        index = PackageIndex()
+        known: IndexEntry | None = index.entries().get(self._dir_name)
+
+        if known is not None:
+            self._paths = Paths(self._dir_name, Path(known.ROOT))
+            self.recoverSwap()
+
+        if known is not None and index.lookup(self._dir_name) is not None:
             self._installed = True
+        else:
+            self._paths = Paths(self._dir_name)
+            self.recoverSwap()
+
+            if importlib.util.find_spec(self._dir_name) is not None:
+                self._installed = True
+
+        self._manifest: bool = False
+        self._manifest_file: Path = self._paths.root().joinpath("manifest.toml")
 
         if self._manifest_file.exists():
             self._manifest = True
@@ -208,15 +417,40 @@ class Package:
 
     # < ------------------------------------------------------------------- > #
 
+    def isInstalled(self) -> bool:
+        """
+        true if the package was found in the index or on sys.path, or has since
+        been installed
+        """
+
+        return self._installed
+
+    # < ------------------------------------------------------------------- > #
+
+    def isUpToDate(self) -> bool:
+        """
+        true if the last download found the package unchanged upstream
+        """
+
+        return self._up_to_date
+
+    # < ------------------------------------------------------------------- > #
+
+    def setSession(self, session: requests.Session | None) -> None:
+        """
+        share a session between packages so connections are reused
+        """
+
+        self._session = session
+
+    # < ------------------------------------------------------------------- > #
+
     def help(self) -> int:
         if not self._manifest:
             PHOTON_LOGGER.error("no manifest for select package")
             return 1
 
-        manifest: dict[str, Any] = {}
-
-        with open(self._manifest_file, "r") as fp:
-            manifest = toml.load(fp)
+        manifest: dict[str, Any] = readToml(self._manifest_file)
 
         help_text: list[str] | None = manifest.get("help_text")
 
@@ -237,14 +471,13 @@ class Package:
     # < ------------------------------------------------------------------- > #
 
     def version(self) -> int:
+        import json
+
         if not self._manifest:
             PHOTON_LOGGER.error("no manifest for select package")
             return 1
 
-        manifest: dict[str, Any] = {}
-
-        with open(self._manifest_file, "r") as fp:
-            manifest = toml.load(fp)
+        manifest: dict[str, Any] = readToml(self._manifest_file)
 
         print(json.dumps(manifest.get("version", []), indent=4))
 
@@ -252,7 +485,32 @@ class Package:
 
     # < ------------------------------------------------------------------- > #
 
-    def run(self, extra_args: list[str]) -> int:
+    def run(
+        self, extra_args: list[str], in_process: bool | None = None, use_daemon: bool = True
+    ) -> int:
+        """
+        run the package as a module with the given args \n
+        in_process runs it in this interpreter instead of a new one, if None a running
+        daemon is used when use_daemon is set, otherwise the manifest decides with
+        in-process under [run], defaulting to a new interpreter
+        """
+
+        if in_process is None and use_daemon:
+            from photon.lib.daemon import runRemote
+
+            returncode: int | None = runRemote(self._dir_name, extra_args)
+
+            if returncode is not None:
+                return returncode
+
+        if in_process is None:
+            in_process = self.runInProcess()
+
+        if in_process:
+            return self.runModule(extra_args)
+
+        import subprocess
+
         run_args: list[str] = [sys.executable, "-m", self._dir_name]
 
         for arg in extra_args:
@@ -266,62 +524,445 @@ class Package:
 
     # < ------------------------------------------------------------------- > #
 
-    def download(self) -> Path | None:
+    def runInProcess(self) -> bool:
+        """
+        check if the manifest asks for the package to run in process
+        """
+
+        if not self._manifest:
+            return False
+
+        manifest: dict[str, Any] = readToml(self._manifest_file)
+        run: dict[str, Any] = {}
+
+        if isinstance(manifest.get("run"), dict):
+            run = manifest["run"]
+
+        return run.get("in-process") is True
+
+    # < ------------------------------------------------------------------- > #
+
+    def runModule(self, extra_args: list[str]) -> int:
+        """
+        run the package with runpy in this interpreter, saving a second startup \n
+        sys.argv is swapped for the run and sys.exit is turned into a return code
+        """
+
+        import runpy
+
+        PHOTON_LOGGER.debug(f"running {self._dir_name} in process with args: {extra_args}")
+
+        argv: list[str] = sys.argv
+        sys.argv = [self._dir_name, *extra_args]
+
+        try:
+            runpy.run_module(self._dir_name, run_name="__main__", alter_sys=True)
+        except SystemExit as exit:
+            if exit.code is None:
+                return 0
+
+            if isinstance(exit.code, int):
+                return exit.code
+
+            print(exit.code, file=sys.stderr)
+            return 1
+        finally:
+            sys.argv = argv
+
+        return 0
+
+    # < ------------------------------------------------------------------- > #
+
+    def cacheKey(self) -> str:
+        """
+        get the key used for this package in the archive cache
+        """
+
+        source: str = self._source if self._source is not None else "github"
+
+        return f"{source}:{self._author}.{self._name}"
+
+    # < ------------------------------------------------------------------- > #
+
+    def archiveUrl(self) -> str | None:
+        """
+        get the url the package archive is downloaded from, None without an author
+        """
+
+        if self._author is None:
+            return None
+
+        return f"https://github.com/{self._author}/{self._name}/zipball/master"
+
+    # < ------------------------------------------------------------------- > #
+
+    def isOutdated(self, probe: Probe) -> bool | None:
+        """
+        check upstream for changes without downloading the archive \n
+        probe makes the request, see Probe, the etag or last modified date of the
+        archive the installed version came from are sent so an unchanged package
+        answers 304 \n
+        None means it could not be told, such as when neither was recorded
+        """
+
+        url: str | None = self.archiveUrl()
+
+        if url is None:
+            PHOTON_LOGGER.warning(f"cannot check {self._raw_name}, requires '<user>.<repo>'")
+            return None
+
+        entry: IndexEntry | None = PackageIndex().lookup(self._dir_name)
+
+        if entry is None or (entry.ETAG is None and entry.LAST_MODIFIED is None):
+            PHOTON_LOGGER.debug(f"no archive recorded for {self._raw_name}, cannot compare")
+            return None
+
+        headers: dict[str, str] = {}
+
+        if entry.ETAG is not None:
+            headers["If-None-Match"] = entry.ETAG
+
+        if entry.LAST_MODIFIED is not None:
+            headers["If-Modified-Since"] = entry.LAST_MODIFIED
+
+        status, response_headers = probe(url, headers)
+
+        if status == 304:
+            return False
+
+        if status != 200:
+            PHOTON_LOGGER.warning(f"received invalid response for {self._raw_name}: {status}")
+            return None
+
+        # < servers that ignore conditional requests still send the validators > #
+        etag: str | None = response_headers.get("etag")
+
+        if etag is not None and entry.ETAG is not None:
+            return etag != entry.ETAG
+
+        last_modified: str | None = response_headers.get("last-modified")
+
+        if last_modified is not None and entry.LAST_MODIFIED is not None:
+            return last_modified != entry.LAST_MODIFIED
+
+        return None
+
+    # < ------------------------------------------------------------------- > #
+
+    def extract(self, archive: IO[bytes] | Path, unzipped_dir: Path) -> Path | None:
+        """
+        extract an archive and return the top level directory it contained
+        """
+
+        from zipfile import ZipFile
+
+        PHOTON_LOGGER.info("extracting...")
+
+        with ZipFile(archive, "r") as zfp:
+            members: list[str] = zfp.namelist()
+
+            if members.__len__() < 1:
+                PHOTON_LOGGER.error("downloaded archive is empty")
+                return None
+
+            zfp.extractall(unzipped_dir)
+
+        src: Path = unzipped_dir.joinpath(members[0].split("/")[0])
+        PHOTON_LOGGER.debug(f"source: {src}")
+
+        return src
+
+    # < ------------------------------------------------------------------- > #
+
+    def fetch(
+        self,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+        memory_limit: int = DOWNLOAD_MEMORY_LIMIT,
+        use_cache: bool = True,
+        skip_unchanged: bool = True,
+    ) -> IO[bytes] | None:
+        """
+        download the package archive and return it open for reading \n
+        the archive is streamed in chunks of chunk_size bytes, without the cache
+        anything past memory_limit bytes is spooled to a temporary file under pkg/ \n
+        with the cache the request is conditional, if the installed version came from
+        the archive upstream still serves nothing is downloaded and None is returned
+        unless skip_unchanged is False, otherwise the cached archive is used
+        """
+
+        import contextlib
+        import tempfile
+
+        import requests
+
+        from photon.lib.cache import ArchiveCache
+
+        self._up_to_date = False
+        self._validators = (None, None)
+
         # < download source > #
-        user_org = self._author
-        repository = self._name
+        url: str | None = self.archiveUrl()
 
-        if user_org is None:
+        if url is None:
             PHOTON_LOGGER.error("too little info, requires '<user>.<repo>'")
             return None
 
-        url: str = f"https://github.com/{user_org}/{repository}/zipball/master"
         PHOTON_LOGGER.info(f"downloading from: {url}")
 
         # < download destination > #
-        old: list[Path] = []
-        new: list[Path] = []
-
-        unzipped_dir = Paths("photon").root().joinpath("pkg")
+        unzipped_dir = sharedPaths("photon").root().joinpath("pkg")
         unzipped_dir.mkdir(parents=True, exist_ok=True)
 
-        for entry in unzipped_dir.iterdir():
-            old.append(entry)
+        cache: ArchiveCache | None = None
+        cache_key: str = self.cacheKey()
+        headers: dict[str, str] = {}
+
+        if use_cache:
+            cache = ArchiveCache(unzipped_dir.joinpath("cache"))
+            headers = cache.headers(cache_key)
 
         # < try download > #
         try:
-            response: requests.Response = requests.get(url)
+            if self._session is None:
+                response: requests.Response = requests.get(url, headers=headers, stream=True)
+            else:
+                response = self._session.get(url, headers=headers, stream=True)
         except requests.exceptions.ConnectionError as error:
             PHOTON_LOGGER.error(f"failed to download:\n {error}")
             return None
 
-        # < is it a valid download? > #
-        if response.status_code != 200:
-            PHOTON_LOGGER.error(f"received invalid response: {response.status_code}")
+        with response:
+            # < unchanged upstream, reuse the cached archive > #
+            if response.status_code == 304 and cache is not None:
+                archive: Path | None = cache.touch(cache_key)
+                cached: CacheEntry | None = cache.get(cache_key)
+
+                if cached is not None:
+                    self._validators = (cached.ETAG, cached.LAST_MODIFIED)
+
+                # < the 304 is about the cached archive, which is not live after a > #
+                # < failed update or a rollback, so compare with what is installed > #
+                if (
+                    self._installed
+                    and skip_unchanged
+                    and cached is not None
+                    and readArchiveInfo(self._paths.root()) == self._validators
+                ):
+                    PHOTON_LOGGER.info("unchanged upstream, nothing to do")
+                    self._up_to_date = True
+                    return None
+
+                if archive is None:
+                    PHOTON_LOGGER.error("unchanged upstream but no cached archive")
+                    return None
+
+                PHOTON_LOGGER.info("unchanged upstream, using cached archive")
+                return open(archive, "rb")
+
+            # < is it a valid download? > #
+            if response.status_code != 200:
+                PHOTON_LOGGER.error(f"received invalid response: {response.status_code}")
+                return None
+
+            self._validators = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+            # < write straight into the cache, it is already on disk > #
+            if cache is not None:
+                try:
+                    archive = cache.store(
+                        cache_key,
+                        response.iter_content(chunk_size=chunk_size),
+                        response.headers.get("ETag"),
+                        response.headers.get("Last-Modified"),
+                    )
+                except requests.exceptions.RequestException as error:
+                    PHOTON_LOGGER.error(f"failed to download:\n {error}")
+                    return None
+
+                return open(archive, "rb")
+
+            # < small archives stay in memory, large ones roll over to disk > #
+            # < closed on any failure, handed to the caller once fully written > #
+            with contextlib.ExitStack() as stack:
+                tfp = stack.enter_context(
+                    tempfile.SpooledTemporaryFile(max_size=memory_limit, dir=str(unzipped_dir))
+                )
+
+                try:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        tfp.write(chunk)
+                except requests.exceptions.RequestException as error:
+                    PHOTON_LOGGER.error(f"failed to download:\n {error}")
+                    return None
+
+                PHOTON_LOGGER.debug(f"downloaded {tfp.tell()} bytes")
+                tfp.seek(0)
+                stack.pop_all()
+
+            return tfp
+
+    # < ------------------------------------------------------------------- > #
+
+    def download(
+        self,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+        memory_limit: int = DOWNLOAD_MEMORY_LIMIT,
+        use_cache: bool = True,
+        skip_unchanged: bool = True,
+    ) -> Path | None:
+        """
+        download the package archive and extract it under pkg/ \n
+        see fetch for the arguments
+        """
+
+        archive: IO[bytes] | None = self.fetch(chunk_size, memory_limit, use_cache, skip_unchanged)
+
+        if archive is None:
             return None
 
-        # < using BytesIO we can unzip without writing a zip to disk > #
-        PHOTON_LOGGER.info("extracting...")
-        with ZipFile(BytesIO(response.content), "r") as zfp:
-            zfp.extractall(unzipped_dir)
+        with archive:
+            return self.extract(archive, sharedPaths("photon").root().joinpath("pkg"))
+
+    # < ------------------------------------------------------------------- > #
 
-        for entry in unzipped_dir.iterdir():
-            new.append(entry)
+    def archiveMembers(self, zfp: ZipFile) -> dict[str, ZipInfo]:
+        """
+        get the files in an archive keyed by their path in the package root \n
+        the top level directory github adds is stripped, unsafe paths are skipped
+        """
 
-        diff = set(new) - set(old)
+        members: dict[str, ZipInfo] = {}
 
-        if diff.__len__() < 1:
-            src = new[0]
-        else:
-            src = diff.pop()
+        for info in zfp.infolist():
+            if info.is_dir():
+                continue
 
-        PHOTON_LOGGER.debug(f"source: {src}")
+            parts: list[str] = info.filename.split("/", 1)
 
-        return src
+            if parts.__len__() < 2 or parts[1] == "":
+                continue
+
+            file: str = parts[1]
+
+            if file.startswith("/") or ".." in file.split("/"):
+                PHOTON_LOGGER.warning(f"skipping unsafe archive member: {info.filename}")
+                continue
+
+            members[file] = info
+
+        return members
+
+    # < ------------------------------------------------------------------- > #
+
+    def hashArchive(self, zfp: ZipFile) -> dict[str, str]:
+        """
+        get the sha256 of every file in an archive without extracting it
+        """
+
+        import hashlib
+
+        hashes: dict[str, str] = {}
+
+        for file, info in self.archiveMembers(zfp).items():
+            sha256 = hashlib.sha256()
+
+            with zfp.open(info) as fp:
+                while chunk := fp.read(DOWNLOAD_CHUNK_SIZE):
+                    sha256.update(chunk)
+
+            hashes[file] = sha256.hexdigest()
+
+        return hashes
+
+    # < ------------------------------------------------------------------- > #
+
+    def extractArchive(
+        self, zfp: ZipFile, root: Path, only: set[str] | None = None
+    ) -> dict[str, str]:
+        """
+        write archive members straight to a package root and return their hashes \n
+        if only is given just those files are written
+        """
+
+        import hashlib
+
+        PHOTON_LOGGER.info("extracting files...")
+
+        hashes: dict[str, str] = {}
+
+        for file, info in self.archiveMembers(zfp).items():
+            if only is not None and file not in only:
+                continue
+
+            file_dst: Path = root.joinpath(file)
+            PHOTON_LOGGER.debug(f"  - {file_dst}")
+
+            sha256 = hashlib.sha256()
+
+            # < mkdir if needed and write, unlinking first as staged files may be hard links > #
+            file_dst.parent.mkdir(parents=True, exist_ok=True)
+            file_dst.unlink(missing_ok=True)
+
+            with zfp.open(info) as src, open(file_dst, "wb") as dst:
+                while chunk := src.read(DOWNLOAD_CHUNK_SIZE):
+                    sha256.update(chunk)
+                    dst.write(chunk)
+
+            hashes[file] = sha256.hexdigest()
+
+        return hashes
+
+    # < ------------------------------------------------------------------- > #
+
+    def readFileManifest(self) -> dict[str, str] | None:
+        """
+        get the hashes of the files written by the last install, if recorded
+        """
+
+        import json
+
+        manifest_file: Path = self._paths.root().joinpath(FILE_MANIFEST)
+
+        if not manifest_file.exists():
+            return None
+
+        try:
+            files: dict[str, str] = json.loads(manifest_file.read_text())["files"]
+        except (OSError, ValueError, KeyError, TypeError):
+            PHOTON_LOGGER.warning("invalid file manifest, ignoring")
+            return None
+
+        return files
+
+    # < ------------------------------------------------------------------- > #
+
+    def writeFileManifest(self, files: dict[str, str], root: Path) -> None:
+        """
+        record the hashes of the installed files in a package root, along with the
+        validators of the archive they came from so isOutdated compares against
+        the installed version
+        """
+
+        import json
+
+        etag, last_modified = self._validators
+        manifest: dict[str, Any] = {"files": files}
+
+        if etag is not None:
+            manifest["etag"] = etag
+
+        if last_modified is not None:
+            manifest["last_modified"] = last_modified
+
+        manifest_file: Path = root.joinpath(FILE_MANIFEST)
+        manifest_file.unlink(missing_ok=True)
+        manifest_file.write_text(json.dumps(manifest, indent=4, sort_keys=True))
 
     # < ------------------------------------------------------------------- > #
 
     def uninstall(self, extra_args: list[str] = []) -> int:
+        import subprocess
+
         run_args: list[str] = [sys.executable, "-m", "pip", "uninstall", self._dir_name]
 
         for arg in extra_args:
@@ -335,14 +976,32 @@ class Package:
             PHOTON_LOGGER.error("failed to uninstall")
             return process.returncode
 
-        if self._paths.root().exists():
-            shutil.rmtree(self._paths.root())
+        # < root goes last, a previous version without a root is restored by recoverSwap > #
+        for path in [self.previousDir(), self.stagingDir(), self._paths.root()]:
+            if path.exists():
+                shutil.rmtree(path)
+
+        PackageIndex().remove(self._dir_name)
+        self._installed = False
 
         return 0
 
     # < ------------------------------------------------------------------- > #
 
-    def update(self, archive_dir: Path | None = None, force: bool = False) -> int:
+    def update(
+        self,
+        archive_dir: Path | None = None,
+        force: bool = False,
+        install_dependencies: bool = True,
+    ) -> int:
+        """
+        update from the archive directory \n
+        if not given the archive is downloaded and extracted straight into the root \n
+        changes are staged next to the package and swapped in once they succeed
+        """
+
+        from zipfile import ZipFile
+
         # < update not install > #
         if force:
             PHOTON_LOGGER.debug("forcing update")
@@ -350,63 +1009,132 @@ class Package:
             PHOTON_LOGGER.error("cannot update, not installed")
             return 1
 
-        if archive_dir is None:
-            archive_dir = self.download()
+        def dependencies(only: set[str] | None) -> bool:
+            if only is not None and "requirements.txt" not in only:
+                PHOTON_LOGGER.debug("requirements unchanged, skipping dependencies")
+                return False
+
+            return install_dependencies
 
+        # < extract straight from the archive into the package root > #
         if archive_dir is None:
-            return 1
+            archive: IO[bytes] | None = self.fetch()
 
-        # move from the archive directory
-        # move to the packge root directory
-        mv_from: list[str] = []
-        mv_to: list[str] = []
+            if archive is None:
+                return 0 if self._up_to_date else 1
 
-        file_src: str
+            fetched: IO[bytes] = archive
 
-        # < from archive for > #
-        for entry in archive_dir.rglob("*"):
-            if entry.is_dir():
-                continue
+            def applyArchive(root: Path) -> int:
+                with fetched, ZipFile(fetched, "r") as zfp:
+                    new_files: dict[str, str] = self.hashArchive(zfp)
+                    only: set[str] | None = self.removeStale(new_files, root)
+
+                    self.extractArchive(zfp, root, only)
+
+                return self.finishInstall(new_files, root, dependencies(only))
 
-            file_src = entry.as_posix().split(archive_dir.as_posix())[1]
-            file_src = file_src.removeprefix(os.sep).removeprefix("/")
+            return self.staged(applyArchive)
 
-            mv_from.append(file_src)
+        source: Path = archive_dir
+        new_files: dict[str, str] = hashTree(source)
 
-        if "update.py" not in mv_from:
-            mv_from.append("update.py")
+        def applyDir(root: Path) -> int:
+            only: set[str] | None = self.removeStale(new_files, root)
+            self.moveFiles(source, root, only)
+
+            return self.finishInstall(new_files, root, dependencies(only))
+
+        return self.staged(applyDir)
+
+    # < ------------------------------------------------------------------- > #
+
+    def removeStale(self, new_files: dict[str, str], root: Path) -> set[str] | None:
+        """
+        remove files from a package root that are not part of the new version \n
+        returns the files that need writing, None meaning all of them
+        """
+
+        old_files: dict[str, str] | None = self.readFileManifest()
+
+        # < no manifest from a previous install, replace everything > #
+        if old_files is None:
+            PHOTON_LOGGER.debug("no file manifest, updating every file")
+            self.removeOrphans(set(new_files), root)
+            return None
+
+        # < only touch what changed since the last install > #
+        changed: set[str] = {
+            file for file, digest in new_files.items() if old_files.get(file) != digest
+        }
+        removed: set[str] = set(old_files) - set(new_files)
+
+        PHOTON_LOGGER.info(f"{changed.__len__()} changed, {removed.__len__()} removed files")
+        PHOTON_LOGGER.info("removing orphaned files...")
+
+        for file in removed:
+            path: Path = root.joinpath(file)
+            PHOTON_LOGGER.debug(f"  - {path}")
+            path.unlink(missing_ok=True)
+
+        # < the cleanup config is read from the root, it is removed by its own cleanup > #
+        if ".photon" in new_files:
+            changed.add(".photon")
+
+        return changed
+
+    # < ------------------------------------------------------------------- > #
+
+    def removeOrphans(self, new_files: set[str], root: Path) -> None:
+        """
+        remove files in a package root that are not in the new version
+        """
+
+        existing: set[str] = {"update.py"}
+        base_length: int = root.parts.__len__()
 
         # < to package root > #
-        for entry in self._paths.root().rglob("*"):
+        for entry in root.rglob("*"):
             if entry.is_dir():
                 continue
 
-            file_src = entry.as_posix().split(self._paths.root().as_posix())[1]
-            file_src = file_src.removeprefix(os.sep).removeprefix("/")
+            file: str = "/".join(entry.parts[base_length:])
 
-            if file_src.startswith("pkg"):
+            if file.startswith("pkg"):
                 continue
 
-            mv_to.append(file_src)
-
-        if "update.py" not in mv_to:
-            mv_to.append("update.py")
+            existing.add(file)
 
         # < clean > #
-        to_remove: set[str] = set(mv_to) - set(mv_from)
+        to_remove: set[str] = existing - new_files - {"update.py"}
 
         PHOTON_LOGGER.info("removing orphaned files...")
 
-        for entry in to_remove:
-            path: Path = self._paths.root().joinpath(entry)
+        for file in to_remove:
+            path = root.joinpath(file)
             PHOTON_LOGGER.debug(f"  - {path}")
             path.unlink()
 
-        return self.install(archive_dir, True)
-
     # < ------------------------------------------------------------------- > #
 
-    def install(self, archive_dir: Path | None = None, force: bool = False) -> int:
+    def install(
+        self,
+        archive_dir: Path | None = None,
+        force: bool = False,
+        install_dependencies: bool = True,
+        files: dict[str, str] | None = None,
+        only: set[str] | None = None,
+    ) -> int:
+        """
+        install from the archive directory \n
+        if not given the archive is downloaded and extracted straight into the root \n
+        files are the hashes of the archive contents, recorded for later updates \n
+        if only is given just those files are moved, the rest are left untouched \n
+        changes are staged next to the package and swapped in once they succeed
+        """
+
+        from zipfile import ZipFile
+
         # < install not update or overwrite > #
         if force:
             PHOTON_LOGGER.debug("forcing install")
@@ -414,11 +1142,40 @@ class Package:
             PHOTON_LOGGER.error("already installed")
             return 1
 
+        # < extract straight from the archive into the package root > #
         if archive_dir is None:
-            archive_dir = self.download()
+            archive: IO[bytes] | None = self.fetch(skip_unchanged=False)
 
-        if archive_dir is None:
-            return 1
+            if archive is None:
+                return 0 if self._up_to_date else 1
+
+            fetched: IO[bytes] = archive
+
+            def applyArchive(root: Path) -> int:
+                with fetched, ZipFile(fetched, "r") as zfp:
+                    extracted: dict[str, str] = self.extractArchive(zfp, root)
+
+                return self.finishInstall(extracted, root, install_dependencies)
+
+            return self.staged(applyArchive)
+
+        source: Path = archive_dir
+        hashes: dict[str, str] = files if files is not None else hashTree(source)
+
+        def applyDir(root: Path) -> int:
+            self.moveFiles(source, root, only)
+
+            return self.finishInstall(hashes, root, install_dependencies)
+
+        return self.staged(applyDir)
+
+    # < ------------------------------------------------------------------- > #
+
+    def moveFiles(self, archive_dir: Path, root: Path, only: set[str] | None = None) -> None:
+        """
+        move files from an extracted archive into a package root \n
+        if only is given just those files are moved
+        """
 
         # < find all package files and move them > #
         PHOTON_LOGGER.info("moving files...")
@@ -428,57 +1185,62 @@ class Package:
             if entry.is_dir():
                 continue
 
-            file_dst: Path = self._paths.root().joinpath(*entry.parts[base_length:])
+            if only is not None and "/".join(entry.parts[base_length:]) not in only:
+                continue
 
-            file: str = entry.as_posix().split(archive_dir.as_posix())[1]
-            file_src: Path = archive_dir.joinpath(file.removeprefix(os.sep).removeprefix("/"))
+            file_dst: Path = root.joinpath(*entry.parts[base_length:])
 
             PHOTON_LOGGER.debug("moving: ")
-            PHOTON_LOGGER.debug(f"  - src: {file_src}")
+            PHOTON_LOGGER.debug(f"  - src: {entry}")
             PHOTON_LOGGER.debug(f"  - dst: {file_dst}")
 
             # < mkdir if needed and move > #
             file_dst.parent.mkdir(parents=True, exist_ok=True)
-            file_src.replace(file_dst)
+            entry.replace(file_dst)
+
+        # < unchanged files are left behind in the archive > #
+        shutil.rmtree(archive_dir, ignore_errors=True)
+
+    # < ------------------------------------------------------------------- > #
+
+    def finishInstall(
+        self, files: dict[str, str], root: Path, install_dependencies: bool = True
+    ) -> int:
+        """
+        install dependencies, record the file manifest and clean up \n
+        called once the package files are in place in root
+        """
+
+        from photon.lib.dependencies import installRequirements, readRequirements
 
         # < install dependencies > #
-        requirements_txt = self._paths.root().joinpath("requirements.txt")
-
-        if requirements_txt.exists():
-            PHOTON_LOGGER.info("installing dependencies...")
-
-            install_args = [
-                sys.executable,
-                "-m",
-                "pip",
-                "install",
-                "-r",
-                requirements_txt.as_posix(),
-            ]
+        requirements_txt = root.joinpath("requirements.txt")
 
-            process = subprocess.run(install_args)
+        if install_dependencies and requirements_txt.exists():
+            returncode = installRequirements([readRequirements(requirements_txt)])
 
-            if process.returncode != 0:
-                PHOTON_LOGGER.error("failed to install dependencies")
-                return process.returncode
+            if returncode != 0:
+                return returncode
+
+        # < only recorded once dependencies succeed so a failed update is retried > #
+        self.writeFileManifest(files, root)
 
         # < cleanup > #
 
         # < empty dirs > #
         PHOTON_LOGGER.info("cleaning up empty directories...")
-        rmEmpty(self._paths.root().parent)
+        rmEmpty(root)
 
         # < this file contains settings for some custom cleanup > #
         # < defined by the package itself > #
         PHOTON_LOGGER.info("extra cleaning...")
-        photon_config = self._paths.root().joinpath(".photon")
+        photon_config = root.joinpath(".photon")
 
         if not photon_config.exists():
             PHOTON_LOGGER.info("no cleaning config, skipping extra cleanup")
             return 0
 
-        with open(photon_config, "r") as fp:
-            config: dict[str, dict[str, list[str]]] = toml.load(fp)
+        config: dict[str, dict[str, list[str]]] = readToml(photon_config)
 
         cleanup_conf = config.get("post-install-clean")
 
@@ -487,19 +1249,19 @@ class Package:
             return 0
 
         for entry in cleanup_conf.get("extend-extensions", []):
-            for globbed_file in self._paths.root().glob(f"*{entry}"):
+            for globbed_file in root.glob(f"*{entry}"):
                 PHOTON_LOGGER.info(f"  - {globbed_file}")
                 globbed_file.unlink()
 
         for entry in cleanup_conf.get("extend-files", []):
-            path = self._paths.root().joinpath(entry)
+            path = root.joinpath(entry)
 
             if path.exists() and not path.is_dir():
                 PHOTON_LOGGER.info(f"  - {path}")
                 path.unlink()
 
         for entry in cleanup_conf.get("extend-dirs", []):
-            path = self._paths.root().joinpath(entry)
+            path = root.joinpath(entry)
 
             if path.exists() and path.is_dir():
                 PHOTON_LOGGER.info(f"  - {path}")
@@ -509,6 +1271,150 @@ class Package:
 
     # < ------------------------------------------------------------------- > #
 
+    def stagingDir(self) -> Path:
+        """
+        get the sibling directory new versions are prepared in
+        """
+
+        root: Path = self._paths.root()
+        return root.parent.joinpath(f".{root.name}.staging")
+
+    # < ------------------------------------------------------------------- > #
+
+    def previousDir(self) -> Path:
+        """
+        get the sibling directory the previous version is kept in
+        """
+
+        root: Path = self._paths.root()
+        return root.parent.joinpath(f".{root.name}.previous")
+
+    # < ------------------------------------------------------------------- > #
+
+    def staged(self, apply: Callable[[Path], int]) -> int:
+        """
+        run apply against a staged copy of the package, then swap it in \n
+        the live package is untouched until apply succeeds and the stage validates,
+        the old version is kept for rollback
+        """
+
+        root: Path = self._paths.root()
+        staging: Path = self.stagingDir()
+
+        if staging.exists():
+            PHOTON_LOGGER.debug(f"removing stale staging directory: {staging}")
+            shutil.rmtree(staging)
+
+        # < hard links make the copy cheap, changed files are replaced not modified > #
+        if root.exists():
+            PHOTON_LOGGER.info("staging...")
+            shutil.copytree(root, staging, symlinks=True, copy_function=linkOrCopy)
+        else:
+            staging.mkdir(parents=True)
+
+        try:
+            returncode: int = apply(staging)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if returncode != 0:
+            PHOTON_LOGGER.error("staged install failed, keeping current version")
+            shutil.rmtree(staging, ignore_errors=True)
+            return returncode
+
+        if not self.validateStage(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+            return 1
+
+        self.swap(staging, root, self.previousDir())
+        self._installed = True
+
+        PackageIndex().record(self._dir_name, root, raw_name=self._raw_name)
+
+        return 0
+
+    # < ------------------------------------------------------------------- > #
+
+    def validateStage(self, staging: Path) -> bool:
+        """
+        check a staged package can be imported or run
+        """
+
+        if staging.joinpath("__init__.py").exists() or staging.joinpath("__main__.py").exists():
+            return True
+
+        PHOTON_LOGGER.error("staged package has no __init__.py or __main__.py")
+        return False
+
+    # < ------------------------------------------------------------------- > #
+
+    def swap(self, new: Path, root: Path, old: Path) -> None:
+        """
+        put new in place of root and keep root as old \n
+        root and new are exchanged in one step where the platform allows, otherwise
+        with two renames, in which case recoverSwap handles a crash between them
+        """
+
+        if old.exists():
+            shutil.rmtree(old)
+
+        if root.exists() and exchangePaths(new, root):
+            # < new now holds the previous version > #
+            new.rename(old)
+        else:
+            if root.exists():
+                root.rename(old)
+
+            new.rename(root)
+
+        PHOTON_LOGGER.debug(f"swapped in {root}, previous kept at {old}")
+
+    # < ------------------------------------------------------------------- > #
+
+    def recoverSwap(self) -> None:
+        """
+        restore the previous version if a swap was cut short and left no root
+        """
+
+        root: Path = self._paths.root()
+        previous: Path = self.previousDir()
+
+        if root.exists() or not previous.exists():
+            return None
+
+        PHOTON_LOGGER.warning(f"{root} is missing after an interrupted swap, restoring {previous}")
+        previous.rename(root)
+
+    # < ------------------------------------------------------------------- > #
+
+    def rollback(self) -> int:
+        """
+        swap the previous version back in, rolling back again undoes the rollback
+        """
+
+        previous: Path = self.previousDir()
+
+        if not previous.exists():
+            PHOTON_LOGGER.error("no previous version to roll back to")
+            return 1
+
+        staging: Path = self.stagingDir()
+
+        if staging.exists():
+            shutil.rmtree(staging)
+
+        previous.rename(staging)
+        self.swap(staging, self._paths.root(), previous)
+
+        PackageIndex().record(self._dir_name, self._paths.root(), raw_name=self._raw_name)
+
+        PHOTON_LOGGER.info("rolled back to the previous version")
+
+        return 0
+
+    # < ------------------------------------------------------------------- > #
+
 
 # < ----------------------------------------------------------------------- > #
 
@@ -519,7 +1425,9 @@ class PhotonPackage(Package):
 
     # < ------------------------------------------------------------------- > #
 
-    def run(self, extra_args: list[str]) -> int:
+    def run(
+        self, extra_args: list[str], in_process: bool | None = None, use_daemon: bool = True
+    ) -> int:
         PHOTON_LOGGER.warning("cannot run self")
         return 1
 
@@ -531,7 +1439,20 @@ class PhotonPackage(Package):
 
     # < ------------------------------------------------------------------- > #
 
-    def update(self, archive_dir: Path | None = None, force: bool = False) -> int:
+    def rollback(self) -> int:
+        PHOTON_LOGGER.warning("cannot roll back self")
+        return 1
+
+    # < ------------------------------------------------------------------- > #
+
+    def update(
+        self,
+        archive_dir: Path | None = None,
+        force: bool = False,
+        install_dependencies: bool = True,
+    ) -> int:
+        import subprocess
+
         # < update not install > #
         if force:
             PHOTON_LOGGER.debug("forcing update")
@@ -543,7 +1464,7 @@ class PhotonPackage(Package):
             archive_dir = self.download()
 
         if archive_dir is None:
-            return 1
+            return 0 if self._up_to_date else 1
 
         update_file_src = archive_dir.joinpath("lib", "package.py")
         update_file_dst = self._paths.root().joinpath("update.py")
@@ -581,7 +1502,14 @@ class PhotonPackage(Package):
 
     # < ------------------------------------------------------------------- > #
 
-    def install(self, archive_dir: Path | None = None, force: bool = False) -> int:
+    def install(
+        self,
+        archive_dir: Path | None = None,
+        force: bool = False,
+        install_dependencies: bool = True,
+        files: dict[str, str] | None = None,
+        only: set[str] | None = None,
+    ) -> int:
         PHOTON_LOGGER.warning("cannot install self")
         return 1
 
@@ -1,7 +1,10 @@
 import importlib.util
+import os
+import sys
 
 from importlib.machinery import ModuleSpec
 from pathlib import Path
+from typing import ClassVar
 
 from photon import PHOTON_LOGGER
 
@@ -45,6 +48,114 @@ def rmEmpty(path: Path) -> None:
 # < ----------------------------------------------------------------------- > #
 
 
+def linkOrCopy(src: str, dst: str) -> str:
+    """
+    hard link a file, copying it instead where links are not supported \n
+    usable as the copy_function of shutil.copytree
+    """
+
+    import shutil
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+    return dst
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def exchangePaths(first: Path, second: Path) -> bool:
+    """
+    swap two existing paths in one step with renameat2 and RENAME_EXCHANGE \n
+    returns False where that is not supported, such as outside of linux, on old
+    kernels or on filesystems without it, the paths are untouched then
+    """
+
+    if sys.platform != "linux":
+        return False
+
+    import ctypes
+
+    # < from fcntl.h and linux/fs.h > #
+    at_fdcwd: int = -100
+    rename_exchange: int = 2
+
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        PHOTON_LOGGER.debug("renameat2 not available")
+        return False
+
+    renameat2.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_uint,
+    ]
+    renameat2.restype = ctypes.c_int
+
+    if renameat2(at_fdcwd, os.fsencode(first), at_fdcwd, os.fsencode(second), rename_exchange) == 0:
+        return True
+
+    PHOTON_LOGGER.debug(f"could not exchange paths: {os.strerror(ctypes.get_errno())}")
+    return False
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def hashTree(path: Path) -> dict[str, str]:
+    """
+    get the sha256 of every file under a path, keyed by relative posix path
+    """
+
+    import hashlib
+
+    hashes: dict[str, str] = {}
+    base_length: int = path.parts.__len__()
+
+    for entry in path.rglob("*"):
+        if not entry.is_file():
+            continue
+
+        with open(entry, "rb") as fp:
+            digest: str = hashlib.file_digest(fp, "sha256").hexdigest()
+
+        hashes["/".join(entry.parts[base_length:])] = digest
+
+    return hashes
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def treeSize(path: Path) -> int:
+    """
+    get the total size in bytes of every file under a path, symlinks are not followed
+    """
+
+    size: int = 0
+
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    size = size + treeSize(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    size = size + entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        PHOTON_LOGGER.debug(f"could not read {path}")
+
+    return size
+
+
+# < ----------------------------------------------------------------------- > #
+
+
 def find_module_root(pkg: str) -> Path | None:
     """
     find the root or origin of a module
@@ -65,22 +176,64 @@ def find_module_root(pkg: str) -> Path | None:
 
 
 class Paths:
-    def __init__(self, pkg: str) -> None:
+    __slots__ = (
+        "_config",
+        "_fonts",
+        "_images",
+        "_manifest",
+        "_resources",
+        "_settings",
+        "_sounds",
+        "_stylesheet",
+        "_uris",
+        "_videos",
+        "pkg",
+        "pkg_root",
+    )
+
+    # < roots found so far, sys.path is searched at most once per package and process > #
+    _found_roots: ClassVar[dict[str, Path]] = {}
+
+    def __init__(self, pkg: str, root: Path | None = None) -> None:
         self.pkg: str = pkg
-        self.pkg_root: Path = self.root()
+
+        # < a known root skips searching sys.path > #
+        self.setRoot(root if root is not None else self.findRoot())
 
     # < ------------------------------------------------------------------- > #
 
     def setRoot(self, path: Path) -> None:
-        self.pkg_root = path
+        """
+        set the package root and work out every path below it
+        """
+
+        # fmt: off
+        self.pkg_root    : Path = path
+        self._resources  : Path = path.joinpath("resources")
+        self._fonts      : Path = self._resources.joinpath("fonts")
+        self._images     : Path = self._resources.joinpath("images")
+        self._sounds     : Path = self._resources.joinpath("sounds")
+        self._videos     : Path = self._resources.joinpath("videos")
+        self._settings   : Path = path.joinpath("settings")
+        self._config     : Path = self._settings.joinpath("settings.toml")
+        self._manifest   : Path = self._settings.joinpath("manifest.toml")
+        self._stylesheet : Path = self._settings.joinpath("stylesheet.css")
+        self._uris       : dict[str, str] | None = None
+        # fmt: on
 
     # < ------------------------------------------------------------------- > #
 
-    def root(self) -> Path:
-        if hasattr(self, "pkg_root"):
-            return self.pkg_root
+    def findRoot(self) -> Path:
+        """
+        find the package root on sys.path, remembered for the rest of the process
+        """
 
-        root: None | Path = find_module_root(self.pkg)
+        root: Path | None = self._found_roots.get(self.pkg)
+
+        if root is not None:
+            return root
+
+        root = find_module_root(self.pkg)
 
         if root is None:
             PHOTON_LOGGER.warning("could not find root, using alternate method")
@@ -88,59 +241,67 @@ class Paths:
             PHOTON_LOGGER.debug(new_root)
             return new_root
 
-        self.pkg_root = root
+        self._found_roots[self.pkg] = root
         return root
 
     # < ------------------------------------------------------------------- > #
 
+    def root(self) -> Path:
+        return self.pkg_root
+
+    # < ------------------------------------------------------------------- > #
+
     def resources(self) -> Path:
-        return self.root().joinpath("resources")
+        return self._resources
 
     # < ------------------------------------------------------------------- > #
 
     def fonts(self) -> Path:
-        return self.resources().joinpath("fonts")
+        return self._fonts
 
     # < ------------------------------------------------------------------- > #
 
     def images(self) -> Path:
-        return self.resources().joinpath("images")
+        return self._images
 
     # < ------------------------------------------------------------------- > #
 
     def sounds(self) -> Path:
-        return self.resources().joinpath("sounds")
+        return self._sounds
 
     # < ------------------------------------------------------------------- > #
 
     def videos(self) -> Path:
-        return self.resources().joinpath("videos")
+        return self._videos
 
     # < ------------------------------------------------------------------- > #
 
     def settings(self) -> Path:
-        return self.root().joinpath("settings")
+        return self._settings
 
     # < ------------------------------------------------------------------- > #
 
     def config(self) -> Path:
-        return self.settings().joinpath("settings.toml")
+        return self._config
 
     # < ------------------------------------------------------------------- > #
 
     def manifest(self) -> Path:
-        return self.settings().joinpath("manifest.toml")
+        return self._manifest
 
     # < ------------------------------------------------------------------- > #
 
     def stylesheet(self) -> Path:
-        return self.settings().joinpath("stylesheet.css")
+        return self._stylesheet
 
     # < ------------------------------------------------------------------- > #
 
     def all(self) -> dict[str, str]:
+        if self._uris is not None:
+            return dict(self._uris)
+
         # fmt: off
-        return {
+        self._uris = {
             "root"       : self.root()       .as_uri(),
             "resources"  : self.resources()  .as_uri(),
             "fonts"      : self.fonts()      .as_uri(),
@@ -154,7 +315,34 @@ class Paths:
         }
         # fmt: on
 
+        return dict(self._uris)
+
     # < ------------------------------------------------------------------- > #
 
 
 # < ----------------------------------------------------------------------- > #
+
+
+# < one shared instance per package, see sharedPaths > #
+_shared_paths: dict[str, Paths] = {}
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def sharedPaths(pkg: str) -> Paths:
+    """
+    get the process wide Paths for a package, created on first use \n
+    callers must not setRoot on it, build their own Paths for that
+    """
+
+    paths: Paths | None = _shared_paths.get(pkg)
+
+    if paths is None:
+        paths = Paths(pkg)
+        _shared_paths[pkg] = paths
+
+    return paths
+
+
+# < ----------------------------------------------------------------------- > #
@@ -0,0 +1,66 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+from pathlib import Path
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < the repository root, which is the photon package itself > #
+REPO_ROOT: Path = Path(__file__).resolve().parent.parent
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def photonSearchPath() -> Path:
+    """
+    get a directory that makes this checkout importable as photon \n
+    a checkout under another name is linked into a temporary directory
+    """
+
+    if REPO_ROOT.name == "photon":
+        return REPO_ROOT.parent
+
+    link_dir = Path(tempfile.mkdtemp(prefix="photon-tools-"))
+    link_dir.joinpath("photon").symlink_to(REPO_ROOT, target_is_directory=True)
+    atexit.register(shutil.rmtree, link_dir, True)
+
+    return link_dir
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def photonEnv(extra_paths: list[Path] | None = None) -> dict[str, str]:
+    """
+    get an environment for subprocesses that import this checkout as photon
+    """
+
+    if extra_paths is None:
+        extra_paths = []
+
+    paths: list[str] = [str(photonSearchPath()), *[str(path) for path in extra_paths]]
+
+    env: dict[str, str] = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([*paths, env.get("PYTHONPATH", "")]).rstrip(os.pathsep)
+
+    return env
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def usePhoton() -> None:
+    """
+    make this checkout importable as photon in the running interpreter
+    """
+
+    sys.path.insert(0, str(photonSearchPath()))
+
+
+# < ----------------------------------------------------------------------- > #
@@ -0,0 +1,154 @@
+"""
+startup regression check for photon run, help and version \n
+each mode is started under -X importtime, it fails if a mode imports one of the
+modules it should not, or if the imports made after interpreter startup take
+longer than the budget \n
+usage: python -m tools.importtime [--budget ms] [--repeat n]
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+
+from pathlib import Path
+
+from .common import photonEnv
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < milliseconds photon may spend importing before a mode starts its work > #
+STARTUP_BUDGET: float = 60
+
+# < runs per mode, the fastest is compared so a busy machine does not fail the check > #
+STARTUP_REPEAT: int = 5
+
+# < modules that only install, update and outdated may import > #
+FORBIDDEN: list[str] = [
+    "charset_normalizer",
+    "requests",
+    "ssl",
+    "toml",
+    "urllib3",
+    "zipfile",
+]
+
+# < the package run starts, it does nothing so only photon is measured > #
+BENCH_PACKAGE: str = "photon_importtime_bench"
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def parseImportTime(output: str) -> tuple[float, set[str]]:
+    """
+    get the milliseconds spent importing after site and the modules imported then \n
+    site is skipped as what it imports depends on the environment, not on photon
+    """
+
+    entries: list[tuple[int, str]] = []
+
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        _, cumulative, name = line.removeprefix("import time:").split("|", 2)
+        entries.append((int(cumulative), name))
+
+        # < imports before site finished belong to the interpreter > #
+        if name == " site":
+            entries = []
+
+    total: int = sum(cumulative for cumulative, name in entries if not name.startswith("  "))
+    modules: set[str] = {name.strip() for _, name in entries}
+
+    return total / 1000, modules
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def measure(mode: list[str], env: dict[str, str], repeat: int) -> tuple[float, set[str]]:
+    """
+    start photon with mode repeat times and get its fastest import time and every
+    module it imported
+    """
+
+    best: float | None = None
+    modules: set[str] = set()
+
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "photon", *mode],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=False,
+        )
+
+        if process.returncode != 0:
+            raise RuntimeError(f"photon {' '.join(mode)} exited with {process.returncode}")
+
+        elapsed, imported = parseImportTime(process.stderr)
+        best = elapsed if best is None else min(best, elapsed)
+        modules = modules | imported
+
+    return best if best is not None else 0, modules
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="check photon startup imports")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET, help="milliseconds")
+    parser.add_argument("--repeat", type=int, default=STARTUP_REPEAT)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as bench_dir:
+        package: Path = Path(bench_dir).joinpath(BENCH_PACKAGE)
+        package.mkdir()
+        package.joinpath("__init__.py").write_text("")
+        package.joinpath("__main__.py").write_text("")
+
+        env: dict[str, str] = photonEnv([Path(bench_dir)])
+        modes: list[list[str]] = [
+            ["run", BENCH_PACKAGE, "--no-daemon"],
+            ["help", "photon"],
+            ["version", "photon"],
+        ]
+
+        failed: bool = False
+
+        for mode in modes:
+            elapsed, modules = measure(mode, env, max(1, options.repeat))
+            leaked: list[str] = sorted(
+                {module.split(".")[0] for module in modules} & set(FORBIDDEN)
+            )
+
+            status: str = "ok"
+
+            if elapsed > options.budget:
+                status = f"over budget of {options.budget:.0f}ms"
+                failed = True
+
+            if leaked.__len__() > 0:
+                status = f"imports {', '.join(leaked)}"
+                failed = True
+
+            print(f"{mode[0]:<8} {elapsed:7.1f}ms  {status}")
+
+    return 1 if failed else 0
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+# < ----------------------------------------------------------------------- > #
@@ -0,0 +1,138 @@
+"""
+benchmark toml parsing on a large generated manifest \n
+compares the toml package photon used to read with, tomllib, and readToml with
+its parsed-file cache cold and warm \n
+usage: python -m tools.toml_bench [--tables n] [--repeat n]
+"""
+
+import argparse
+import sys
+import tempfile
+import timeit
+
+from collections.abc import Callable
+from pathlib import Path
+
+from .common import usePhoton
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+# < tables in the generated manifest, each with a few keys and a help text array > #
+BENCH_TABLES: int = 500
+
+# < runs per parser, the fastest is reported > #
+BENCH_REPEAT: int = 20
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def makeManifest(tables: int) -> str:
+    """
+    build a manifest shaped like photon's, only much larger
+    """
+
+    lines: list[str] = [
+        'help_text = ["{H1}photon{R}", "{H2}usage{R}"]',
+        "",
+        "[version]",
+        "major = 1",
+        "minor = 0",
+        "revision = 1",
+    ]
+
+    tags: str = ", ".join(f'"tag-{tag}"' for tag in range(8))
+
+    for index in range(tables):
+        lines.extend(
+            [
+                "",
+                f"[section_{index}]",
+                f'name = "entry {index}"',
+                f"enabled = {'true' if index % 2 == 0 else 'false'}",
+                f"weight = {index * 1.5}",
+                f"tags = [{tags}]",
+                f'help = ["{{H3}}line one of {index}{{R}}", "line two", "line three"]',
+            ]
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def fastest(function: Callable[[], object], repeat: int) -> float:
+    """
+    get the fastest of repeat runs in milliseconds
+    """
+
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="benchmark toml parsing")
+    parser.add_argument("--tables", type=int, default=BENCH_TABLES)
+    parser.add_argument("--repeat", type=int, default=BENCH_REPEAT)
+    options = parser.parse_args()
+
+    import logging
+    import tomllib
+
+    usePhoton()
+
+    from photon import PHOTON_LOGGER
+    from photon.lib import files
+
+    # < readToml logs every parse, which would flood the output and the timings > #
+    PHOTON_LOGGER.setLevel(logging.WARNING)
+
+    text: str = makeManifest(options.tables)
+    results: dict[str, float] = {}
+
+    try:
+        import toml
+
+        results["toml.loads"] = fastest(lambda: toml.loads(text), options.repeat)
+    except ImportError:
+        print("toml is not installed, skipping it")
+
+    results["tomllib.loads"] = fastest(lambda: tomllib.loads(text), options.repeat)
+
+    with tempfile.TemporaryDirectory() as bench_dir:
+        manifest: Path = Path(bench_dir).joinpath("manifest.toml")
+        manifest.write_text(text)
+
+        def cold() -> None:
+            files._toml_cache.clear()
+            files.readToml(manifest)
+
+        results["readToml (cold)"] = fastest(cold, options.repeat)
+
+        files.readToml(manifest)
+        results["readToml (cached)"] = fastest(lambda: files.readToml(manifest), options.repeat)
+
+    print(f"{options.tables} tables, {text.encode().__len__() / 1024:.0f} KiB")
+
+    baseline: float | None = results.get("toml.loads")
+
+    for name, elapsed in results.items():
+        speedup: str = f"  {baseline / elapsed:5.1f}x" if baseline is not None else ""
+        print(f"  {name:<18} {elapsed:8.2f}ms{speedup}")
+
+    return 0
+
+
+# < ----------------------------------------------------------------------- > #
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+# < ----------------------------------------------------------------------- > #